@@ -1,51 +1,257 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from io import BytesIO
+from typing import Callable, Dict, List, Optional
 from urllib import response
+import threading
+import time
 import requests
 from PIL import Image
 from requests.exceptions import ConnectionError
+
+import http_client
+from photo_pipeline import Dither, PhotoConverter
+
+
+@dataclass
+class SettingsResult:
+    applied: Dict[str, int] = field(default_factory=dict)
+    skipped: Dict[str, int] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+
+
+def extract_jpeg_frames(buffer: bytearray) -> List[bytes]:
+    """Pulls every complete JPEG out of the front of buffer, leaving any partial one behind.
+
+    Frames are found by their start and end markers rather than the
+    multipart boundary, JPEG byte stuffing means the end marker can't show
+    up inside the image data itself.
+    """
+    frames = []
+    while True:
+        start = buffer.find(JPEG_START)
+        if start < 0:
+            # keep the last byte in case it's the first half of a start marker
+            del buffer[:max(len(buffer) - 1, 0)]
+            break
+        end = buffer.find(JPEG_END, start + len(JPEG_START))
+        if end < 0:
+            del buffer[:start]
+            break
+        end += len(JPEG_END)
+        frames.append(bytes(buffer[start:end]))
+        del buffer[:end]
+    return frames
+
+
+class MjpegStream:
+    """Reads an MJPEG stream in the background, only ever keeping the newest frame.
+
+    One thread reads the stream and splits out the JPEGs, another converts
+    the latest one with convert. If frames arrive faster than they can be
+    converted the older ones are dropped (and counted) instead of queueing,
+    so frame always shows what the camera sees now.
+    """
+    CHUNK_SIZE = 4096
+    MAX_BUFFER = 1024 * 1024
+    RECONNECT_DELAY = 2
+
+    def __init__(self, url: str, convert: Callable[[bytes], Image.Image], timeout: float=5):
+        self.url = url
+        self.convert = convert
+        self.timeout = timeout
+        self.frame: Optional[Image.Image] = None
+        self.frame_count = 0
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self._running = False
+        self._latest_jpeg: Optional[bytes] = None
+        self._lock = threading.Lock()
+        self._jpeg_ready = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._read, name='mjpeg-reader', daemon=True),
+            threading.Thread(target=self._convert, name='mjpeg-convert', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        self._jpeg_ready.set()
+
+    def _read(self):
+        while self._running:
+            try:
+                with http_client.get(self.url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    buffer = bytearray()
+                    for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                        if not self._running:
+                            break
+                        buffer += chunk
+                        for jpeg in extract_jpeg_frames(buffer):
+                            self._publish(jpeg)
+                        if len(buffer) > self.MAX_BUFFER:
+                            print("Camera stream lost sync, dropping buffer")
+                            buffer.clear()
+            except requests.RequestException as err:
+                # includes the camera going away mid-stream (ChunkedEncodingError)
+                print(f"Camera stream failed: {err}")
+            except Exception as err:
+                # anything else would kill the reader with running still set,
+                # leaving the Alerts screen stuck on the last frame
+                print(f"Camera stream failed unexpectedly, reconnecting: {err!r}")
+            if self._running:
+                time.sleep(self.RECONNECT_DELAY)
+
+    def _publish(self, jpeg: bytes):
+        with self._lock:
+            if self._latest_jpeg is not None:
+                self.frames_dropped += 1
+            self._latest_jpeg = jpeg
+            self.frames_received += 1
+        self._jpeg_ready.set()
+
+    def _convert(self):
+        while self._running:
+            self._jpeg_ready.wait(timeout=1)
+            with self._lock:
+                jpeg = self._latest_jpeg
+                self._latest_jpeg = None
+                self._jpeg_ready.clear()
+            if jpeg is None:
+                continue
+            try:
+                self.frame = self.convert(jpeg)
+                self.frame_count += 1
+            except Exception as err:
+                print(f"Camera stream frame failed to convert: {err}")
+
+
 class JarvisCamera:
-    def __init__(self, ip: str, photo_dir: str, camera_name: str):
+    MAX_CONCURRENT_REQUESTS = 3
+    SETTINGS_DEADLINE = 3.0
+    STREAM_PORT = 81
+    FRAME_SIZE = (400, 240)
+
+    def __init__(self, ip: str, photo_dir: str, camera_name: str, dither: Dither=Dither.FloydSteinberg):
         self.camera_name = camera_name
         self.camera_address = f"http://{ip}"
+        self.stream_address = f"http://{ip}:{self.STREAM_PORT}/stream"
+        self.stream: Optional[MjpegStream] = None
+        self.converter = PhotoConverter(self.FRAME_SIZE, dither)
         self.photo_dir = photo_dir
-        self.CAMERA_DEFAULTS = [
-            "framesize&val=8",
-            "quality&val=10",
-            "awb&val=1",
-            "awb_gain&val=1",
-            "wb_mode&val=0",
-            "aec&val=1",
-            "aec2&val=1",
-            "ae_level&val=2",
-            "gainceiling&val=6",
-            "bpc&val=1",
-            "wpc&val=1",
-            "raw_gma&val=1",
-            "lenc&val=1",
-            "hmirror&val=1",
-            "vflip&val=1",
-        ]
+        self.timeout = 1
+        self.CAMERA_DEFAULTS = {
+            "framesize": 8,
+            "quality": 10,
+            "awb": 1,
+            "awb_gain": 1,
+            "wb_mode": 0,
+            "aec": 1,
+            "aec2": 1,
+            "ae_level": 2,
+            "gainceiling": 6,
+            "bpc": 1,
+            "wpc": 1,
+            "raw_gma": 1,
+            "lenc": 1,
+            "hmirror": 1,
+            "vflip": 1,
+        }
+        self.applied_settings: Dict[str, int] = {}
         self.set_defaults()
         self.photo_count = 0
 
-    def set_defaults(self):
-        errors = 0
-        for camera_default in self.CAMERA_DEFAULTS :
-            try:
-                url = f"{self.camera_address}/control?var={camera_default}"
-                r = requests.get(url, verify=False, timeout=1)
-                if r.status_code != 200:
-                    errors = errors + 1
-                    break
-            except ConnectionError:
-                print("Camera Failed to connect")
-            except requests.ReadTimeout:
-                print("Camera timed out")
+    def set_defaults(self) -> SettingsResult:
+        return self.apply_settings(self.CAMERA_DEFAULTS)
+
+    def apply_settings(self, settings: Dict[str, int], deadline: float=None, force: bool=False) -> SettingsResult:
+        """Pushes camera settings concurrently, skipping any the camera already has.
+
+        Everything has to finish within deadline seconds, settings that haven't
+        by then are reported as failed rather than holding up the caller.
+        """
+        if deadline is None:
+            deadline = self.SETTINGS_DEADLINE
+        started = time.monotonic()
+        result = SettingsResult()
+        pending = {}
+        for name, value in settings.items():
+            if not force and self.applied_settings.get(name) == value:
+                result.skipped[name] = value
+            else:
+                pending[name] = value
+
+        if pending:
+            executor = ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS, thread_name_prefix='camera')
+            futures = {
+                executor.submit(self._apply_setting, name, value, started + deadline): name
+                for name, value in pending.items()
+            }
+            done, not_done = wait(futures, timeout=deadline)
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in done:
+                name = futures[future]
+                error = future.result()
+                if error is None:
+                    result.applied[name] = pending[name]
+                    self.applied_settings[name] = pending[name]
+                else:
+                    result.failed[name] = error
+            for future in not_done:
+                result.failed[futures[future]] = "deadline exceeded"
+
+        if result.failed:
+            # the camera may have rebooted or dropped off, so don't trust
+            # anything we think it already has next time round
+            self.applied_settings = {}
+            print(f"Camera {self.camera_name} failed to apply {len(result.failed)} settings")
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def _apply_setting(self, name: str, value: int, deadline: float):
+        timeout = min(self.timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return "deadline exceeded"
+        try:
+            url = f"{self.camera_address}/control?var={name}&val={value}"
+            r = http_client.get(url, verify=False, timeout=timeout)
+            if r.status_code != 200:
+                return f"HTTP {r.status_code}"
+        except ConnectionError:
+            return "Camera Failed to connect"
+        except requests.Timeout:
+            return "Camera timed out"
+        except requests.RequestException as err:
+            # anything else, like a broken chunked response, is still just
+            # this setting failing, not the whole batch
+            return f"Camera request failed: {err!r}"
+        return None
 
     def get_photo(self):
         file_path = None
         try:
-            snapshot = requests.get(f'{self.camera_address}/capture?', verify=False, timeout=1)
+            snapshot = http_client.get(f'{self.camera_address}/capture?', verify=False, timeout=self.timeout)
             file_path = f"{self.photo_dir}snapshot.jpg"
             with open(file_path,'wb') as f:
                 f.write(snapshot.content)
@@ -61,25 +267,45 @@ class JarvisCamera:
     def get_photo_bw(self):
         im = None
         try:
-            response = requests.get(f'{self.camera_address}/capture?', verify=False, timeout=1)
-            image_data = Image.open(BytesIO(response.content))
-            im  = self.format_photo(image_data, optimum_size=(400,240))
+            response = http_client.get(f'{self.camera_address}/capture?', verify=False, timeout=self.timeout)
+            im = self.converter.convert(response.content)
         except ConnectionError:
             pass
         except requests.ReadTimeout:
             pass
+        except IOError:
+            print("Pillow failed to open the camera image")
         return im
 
+    def start_stream(self):
+        if self.stream is None:
+            self.stream = MjpegStream(self.stream_address, self.convert_stream_frame)
+        self.stream.start()
+
+    def stop_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+
+    @property
+    def streaming(self) -> bool:
+        return self.stream is not None and self.stream.running
+
+    def get_stream_frame(self):
+        """Returns (frame number, image) for the newest streamed frame, image is None until one arrives."""
+        if self.stream is None:
+            return 0, None
+        return self.stream.frame_count, self.stream.frame
+
+    def convert_stream_frame(self, jpeg: bytes):
+        return self.converter.convert(jpeg)
+
     def format_photo(self, im, optimum_size):
         try:
-            preferred_width,preferred_height = optimum_size
-            im.thumbnail((preferred_width, 400))
-            actual_width, actual_height = im.size
-            height_remainder = actual_height - preferred_height
-            top = height_remainder / 2
-            bottom = actual_height - (height_remainder / 2)
-            im = im.crop((0, top, preferred_width, bottom))
-            im = im.convert('1')
+            converter = self.converter
+            if tuple(optimum_size) != converter.size:
+                converter = PhotoConverter(optimum_size, converter.dither)
+            im = converter.convert(im)
         except AttributeError:
             print("Pillow failed to open the original image")
         except IOError:
@@ -12,6 +12,11 @@
 import os
 import requests
 import datetime
+from bisect import bisect_right
+from typing import List
+
+import http_client
+from temperature_series import DAY, TIMESTAMP_KEY, VALUE_KEY, WEEK, RollingExtremes, TemperatureSeries
 
 
 
@@ -20,37 +25,69 @@ class Jarvis:
         if os.environ.get('JARVIS_TEMPS_URL') is None:
             raise EnvironmentError(f'Failed because JARVIS_TEMPS_URL envar is not set')
         self.temps_url = os.environ.get('JARVIS_TEMPS_URL')
+        # query parameter asking Jarvis for readings after a timestamp, empty to always get the week
+        self.since_param = os.environ.get('JARVIS_SINCE_PARAM', 'since')
+        self.timeout = 5
         self.latest_temperature = 0
-        self.temperatures = []
+        self.latest_timestamp = None
+        self.temperatures = TemperatureSeries()
+        self.day_extremes = RollingExtremes(DAY)
+        self.week_extremes = RollingExtremes(WEEK)
         self.min_temp_24h = 0
         self.max_temp_24h = 0
         self.min_temp_week = 0
         self.max_temp_week = 0
-        self.next_access = datetime.datetime.now() 
+        self.version = 0
+        self.next_access = datetime.datetime.now()
 
     def get_temps(self):
         try:
             current_time = datetime.datetime.now()
             if self.next_access < current_time:
-                response = requests.get(self.temps_url)
+                params = {}
+                if self.latest_timestamp is not None and self.since_param:
+                    params[self.since_param] = self.latest_timestamp
+                response = http_client.get(self.temps_url, timeout=self.timeout, params=params)
                 response.raise_for_status()
-                json_response = response.json()
-                self.latest_temperature = json_response[0]['Value']
-                self.temperatures = json_response
-                record_count = 0
-                for record in self.temperatures:
-                    for k, v in record.items():
-                        if k == 'Value':
-                            self.temperatures[record_count]['Value'] = float(v)
-                    record_count +=1
+                self.add_records(response.json())
                 self.next_access = current_time + datetime.timedelta(minutes=5)
-                self.min_temp_24h = min(self.temperatures[0:288], key=lambda x:x['Value'])['Value']
-                self.max_temp_24h = max(self.temperatures[0:288], key=lambda x:x['Value'])['Value']
-                self.min_temp_week = min(self.temperatures, key=lambda x:x['Value'])['Value']
-                self.max_temp_week = max(self.temperatures, key=lambda x:x['Value'])['Value']
 
         except requests.HTTPError as http_err:
             print(f'HTTP error occurred: {http_err}')
         except Exception as err:
             print(f'Other error occurred: {err}')
         return self.latest_temperature
+
+    def add_records(self, records: List[dict]) -> bool:
+        """Adds the readings (newest first) we haven't seen yet, returns False if there weren't any.
+
+        Jarvis may or may not have honoured since, so anything at or before
+        the newest reading we already have is ignored either way.
+        """
+        if not records:
+            return False
+        received = TemperatureSeries.from_records(records)
+        if not received.timestamped or not self.temperatures.timestamped or len(self.temperatures) == 0:
+            # can't tell which readings are new without timestamps, start again
+            self.temperatures = TemperatureSeries()
+            self.temperatures.timestamped = received.timestamped
+            self.day_extremes = RollingExtremes(DAY)
+            self.week_extremes = RollingExtremes(WEEK)
+            start = 0
+        else:
+            start = bisect_right(received.timestamps, self.temperatures.latest_timestamp)
+            if start == len(received):
+                return False
+
+        for timestamp, value in zip(received.timestamps[start:], received.values[start:]):
+            self.temperatures.append(timestamp, value)
+            self.day_extremes.push(timestamp, value)
+            self.week_extremes.push(timestamp, value)
+        self.temperatures.trim(self.temperatures.latest_timestamp - WEEK)
+
+        self.latest_temperature = records[0][VALUE_KEY]
+        self.latest_timestamp = records[0].get(TIMESTAMP_KEY)
+        self.min_temp_24h, self.max_temp_24h = self.day_extremes.min, self.day_extremes.max
+        self.min_temp_week, self.max_temp_week = self.week_extremes.min, self.week_extremes.max
+        self.version += 1
+        return True
@@ -10,13 +10,47 @@
 """OpenWeather module"""
 from enum import Enum
 import os
-import requests
 import json
+import fcntl
 import datetime
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
+
+import requests
+
+import http_client
+
+# the payload on disk is good for an hour, and the free tier allows 1000 calls a day
+CACHE_TTL = 60 * 60
+DAILY_CALL_BUDGET = 1000
+# only daily and hourly get drawn, leave the rest out of the response
+EXCLUDE = 'current,minutely,alerts'
 
-@dataclass 
+# OpenWeatherMap icon code -> isneezy open-weather-icons character
+ICONS = {
+    '01d': "\uea02",
+    '01n': "\uea01",
+    '02d': "\uea03",
+    '02n': "\uea04",
+    '03d': "\uea05",
+    '03n': "\uea06",
+    '04d': "\uea07",
+    '04n': "\uea08",
+    '09d': "\uea09",
+    '09n': "\uea0a",
+    '10d': "\uea0b",
+    '10n': "\uea0c",
+    '11d': "\uea0d",
+    '11n': "\uea0e",
+    '1232n': "\uea0f",
+    '13d': "\uea10",
+    '13n': "\uea11",
+    '50d': "\uea12",
+    '50n': "\uea13",
+}
+
+@dataclass(frozen=True, slots=True)
 class WeatherDescriptionObject:
     id: int
     main: str
@@ -24,7 +58,7 @@ class WeatherDescriptionObject:
     icon: str
     unicode_icon: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class HourlyWeatherObject:
     dt: int
     friendly_time: str
@@ -44,7 +78,7 @@ class HourlyWeatherObject:
     weather: List[WeatherDescriptionObject]
     pop: int
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DailyWeatherTempsObject:
     day: float
     day_c:float
@@ -54,7 +88,7 @@ class DailyWeatherTempsObject:
     eve: float
     morn: float
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DailyWeatherObject:
     dt: int
     friendly_day: str
@@ -76,6 +110,10 @@ class DailyWeatherObject:
     pop: int
     uvi: float
 
+class WeatherDataUnavailable(Exception):
+    """Nothing cached and the API can't be called, so there's no weather to report."""
+
+
 class WeatherReport(Enum):
     Hourly = 0
     Daily = 1
@@ -92,36 +130,25 @@ class OpenWeather:
         if os.environ.get('MYLOCATIONLAT') is None:
             raise EnvironmentError(f'Failed because MYLOCATIONLAT envar is not set')
         self.location_lat = os.environ.get('MYLOCATIONLAT')
-        self.part = None
+        self.part = EXCLUDE
         self.base_url = f'https://api.openweathermap.org/data/2.5/onecall?lat={self.location_lat}&lon={self.location_long}&exclude={self.part}&appid={self.api_key}'
+        self.timeout = 10
         self.filepath = "weather_report.json"
         self.weather_reports = []
         self.hourly_reports = []
         self.daily_reports = []
-        self.next_access = datetime.datetime.now() 
+        # when the payload in weather_reports was fetched, parsed reports are
+        # kept per (report type, fetched_at) so they're only built once each
+        self.fetched_at = None
+        self.reports: Dict[Tuple[WeatherReport, float], List] = {}
+        self.version = 0
+        self.cache_ttl = CACHE_TTL
+        self.call_budget = DAILY_CALL_BUDGET
+        # API calls made today (UTC), shared with other processes through the cache file
+        self.calls = {'day': None, 'count': 0}
 
     def convert_from_icon_to_unicode(self, icon):
-        icons = {}
-        icons['01d'] = "\uea02"
-        icons['01n'] = "\uea01"
-        icons['02d'] = "\uea03"
-        icons['02n'] = "\uea04"
-        icons['03d'] = "\uea05"
-        icons['03n'] = "\uea06"
-        icons['04d'] = "\uea07"
-        icons['04n'] = "\uea08"
-        icons['09d'] = "\uea09"
-        icons['09n'] = "\uea0a"
-        icons['10d'] = "\uea0b"
-        icons['10n'] = "\uea0c"
-        icons['11d'] = "\uea0d"
-        icons['11n'] = "\uea0e"
-        icons['1232n'] = "\uea0f"
-        icons['13d'] = "\uea10"
-        icons['13n'] = "\uea11"
-        icons['50d'] = "\uea12"
-        icons['50n'] = "\uea13"
-        return icons[icon]
+        return ICONS[icon]
 
     def convert_from_f_to_c(self, f_temp:float):
         c_temp = (f_temp-32) * .5556
@@ -132,7 +159,8 @@ class OpenWeather:
         return c_temp
 
     def convert_dt_to_datetime(self, dt: str):
-        return datetime.datetime.utcfromtimestamp(dt)
+        # local time, the same as the clock, so the hourly labels follow BST
+        return datetime.datetime.fromtimestamp(dt)
 
     def create_hourly_reports(self):
         self.hourly_reports = []
@@ -141,7 +169,8 @@ class OpenWeather:
                 raw_weather['weather'][0]['id'], 
                 raw_weather['weather'][0]['main'], 
                 raw_weather['weather'][0]['description'], 
-                raw_weather['weather'][0]['icon']
+                raw_weather['weather'][0]['icon'],
+                self.convert_from_icon_to_unicode(raw_weather['weather'][0]['icon'])
             )
 
             weather_datetime = self.convert_dt_to_datetime(raw_weather['dt'])
@@ -162,11 +191,12 @@ class OpenWeather:
                 raw_weather['visibility'],
                 raw_weather['wind_speed'],
                 raw_weather['wind_deg'],
-                raw_weather['wind_gust'],
+                raw_weather.get('wind_gust'),
                 hourlyWeatherDescriptionObject,
                 raw_weather['pop']
             )
             self.hourly_reports.append(hourlyWeatherObject)
+        self.version += 1
         return self.hourly_reports
 
     def create_daily_reports(self):
@@ -214,7 +244,7 @@ class OpenWeather:
                 raw_weather['dew_point'],
                 raw_weather['wind_speed'],
                 raw_weather['wind_deg'],
-                raw_weather['wind_gust'],
+                raw_weather.get('wind_gust'),
                 weather,
                 raw_weather['clouds'],
                 raw_weather['pop'],
@@ -222,37 +252,101 @@ class OpenWeather:
             )
 
             self.daily_reports.append(report)
+        self.version += 1
         return self.daily_reports
 
     def get_weather_data(self):
         weather_reports = []
-        response = requests.get(self.base_url)
+        # stamped with when we asked, so the next hourly refresh doesn't find
+        # the cache still fresh by however long the request took
+        requested_at = datetime.datetime.now().timestamp()
+        response = http_client.get(self.base_url, timeout=self.timeout)
+        response.raise_for_status()
         weather_reports = response.json()
         self.weather_reports = weather_reports
+        self.fetched_at = requested_at
+
+    @contextmanager
+    def cache_lock(self):
+        """Held while checking and refreshing the cache, so two processes never both call the API."""
+        with open(f'{self.filepath}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
     def save_weather_data_to_file(self, weather_reports):
-        with open(self.filepath, "w") as file_write:
-            json.dump(weather_reports, file_write)
-                
+        temp_filepath = f'{self.filepath}.tmp'
+        with open(temp_filepath, "w") as file_write:
+            json.dump({'fetched_at': self.fetched_at, 'calls': self.calls, 'payload': weather_reports}, file_write)
+        os.replace(temp_filepath, self.filepath)
+
     def load_weather_data_from_file(self):
-        json_file_object = open(self.filepath)
-        weather_report = json.load(json_file_object)
-        self.weather_reports = weather_report
+        with open(self.filepath) as json_file_object:
+            weather_report = json.load(json_file_object)
+        if 'payload' in weather_report:
+            self.weather_reports = weather_report['payload']
+            self.fetched_at = weather_report['fetched_at']
+            self.calls = weather_report.get('calls', self.calls)
+        else:
+            # written before the cache kept its fetch time, the file's age will do
+            self.weather_reports = weather_report
+            self.fetched_at = os.path.getmtime(self.filepath)
 
-    def get_report(self, report_type: WeatherReport, from_file: bool=True):
-        current_time = datetime.datetime.now()
-        if self.next_access < current_time and from_file is False:
-            print('Getting live data from OpenWeatherMap')
+    def cache_fresh(self, now: float) -> bool:
+        return self.fetched_at is not None and now - self.fetched_at < self.cache_ttl
+
+    def call_budget_left(self, now: float) -> bool:
+        today = datetime.datetime.utcfromtimestamp(now).date().isoformat()
+        if self.calls.get('day') != today:
+            self.calls = {'day': today, 'count': 0}
+        return self.calls['count'] < self.call_budget
+
+    def refresh_weather_data(self, now: float):
+        """Calls the API if the budget allows, keeping the stale payload if that fails.
+
+        Raises WeatherDataUnavailable if the budget's used up and there's
+        nothing cached to fall back on.
+        """
+        if not self.call_budget_left(now):
+            if len(self.weather_reports) < 1:
+                raise WeatherDataUnavailable('OpenWeatherMap call budget used up for today and nothing cached')
+            print('OpenWeatherMap call budget used up for today, using cached data')
+            return
+        print('Getting live data from OpenWeatherMap')
+        self.calls['count'] += 1
+        try:
             self.get_weather_data()
+        except (requests.RequestException, ValueError) as err:
+            if len(self.weather_reports) < 1:
+                raise
+            print(f'OpenWeatherMap unavailable, using data from {round((now - self.fetched_at) / 60)} minutes ago: {err}')
+        finally:
+            # failed calls count against the budget too, so always record the attempt
             self.save_weather_data_to_file(self.weather_reports)
-            self.next_access = current_time + datetime.timedelta(hours=1)
+
+    def get_report(self, report_type: WeatherReport, from_file: bool=True):
+        now = datetime.datetime.now().timestamp()
+        if from_file is False and not self.cache_fresh(now):
+            with self.cache_lock():
+                # another process may have refreshed it while we waited
+                if os.path.exists(self.filepath):
+                    self.load_weather_data_from_file()
+                if not self.cache_fresh(now):
+                    self.refresh_weather_data(now)
         elif len(self.weather_reports) < 1:
             print('Loading data from file')
             self.load_weather_data_from_file()
 
-        if report_type == WeatherReport.Daily:
-            return self.create_daily_reports()
-
-        elif report_type == WeatherReport.Hourly:  
-            return self.create_hourly_reports()  
-
+        # the same payload always parses to the same reports, and hourly
+        # ones are only built if something actually asks for them
+        key = (report_type, self.fetched_at)
+        if key not in self.reports:
+            if report_type == WeatherReport.Daily:
+                reports = self.create_daily_reports()
+            elif report_type == WeatherReport.Hourly:
+                reports = self.create_hourly_reports()
+            self.reports = {cached_key: cached for cached_key, cached in self.reports.items() if cached_key[1] == self.fetched_at}
+            self.reports[key] = reports
+        return self.reports[key]
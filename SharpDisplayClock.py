@@ -14,58 +14,28 @@
 from enum import Enum
 import os, sys
 
-import board
-import busio
-import digitalio
 import arrow
 from PIL import Image, ImageDraw, ImageFont
 
-import adafruit_sharpmemorydisplay
 from datetime import datetime
 from datetime import timedelta
 import time
-from threading import Timer
-from InkyImpression import InkyImpression
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
 import OpenWeather
 import Jarvis
 from inky_caldav_calendar import InkyImpression as InkyCalendar
 from CameraServer import JarvisCamera
-
-class InfiniteTimer():
-    """A Timer class that does not stop, unless you want it to."""
-    def __init__(self, milliseconds, target):
-        self._should_continue = False
-        self.is_running = False
-        self.milliseconds = milliseconds
-        self.target = target
-        self.thread = None
-
-    def _handle_target(self):
-        self.is_running = True
-        self.target()
-        self.is_running = False
-        self._start_timer()
-
-    def _start_timer(self):
-        if self._should_continue:
-            self.thread = Timer(self.milliseconds/1000, self._handle_target)
-            self.thread.start()
-
-    def start(self):
-        if not self._should_continue and not self.is_running:
-            self._should_continue = True
-            self._start_timer()
-        else:
-            print("Timer already started or running, please wait if you're restarting.")
-
-    def cancel(self):
-        if self.thread is not None:
-            self._should_continue = False
-            self.thread.cancel()
-        else:
-            print("Timer never started or failed to initialize.")
+from display_backends import SHARP_HEIGHT, SHARP_WIDTH, DisplayBackend, backend_from_env
+from frame_diff import FrameDiff, SharpLineWriter
+from framebuffer import PackedTile, SharpFramebuffer
+from glyph_cache import GlyphCache
+from layers import Layer, LayerCache, ScreenLayers, fit_columns
+from scheduler import Scheduler
+from refresh_worker import RefreshWorker
+from chart import LineChart
+from temperature_series import DAY, WEEK
 
 class Screens(Enum):
     Weather = 1
@@ -73,9 +43,20 @@ class Screens(Enum):
     Alerts = 3
     Settings = 4
 
+class WeatherView(Enum):
+    Daily = 1
+    Hourly = 2
+
+@dataclass
+class ClockFace:
+    """What the clock draws over the screen each tick, whichever way it gets drawn."""
+    dots: bool
+    seconds_bar: Tuple[float, float, float, float]
+    text: List[Tuple[GlyphCache, Tuple[float, float], str]] = field(default_factory=list)
+
 class SharpDisplayClock:
-    SCREEN_WIDTH = 400
-    SCREEN_HEIGHT = 240
+    SCREEN_WIDTH = SHARP_WIDTH
+    SCREEN_HEIGHT = SHARP_HEIGHT
     BLACK = 0
     WHITE = 255
     BORDER = 5
@@ -92,6 +73,18 @@ class SharpDisplayClock:
     CLOCK_LEFT = -6
     CLOCK_MINUTES_LEFT = 150
     CLOCK_TOP = -34
+    CLOCK_DOT_SIZE = 16
+    CLOCK_DOT_TOPS = (27, 67)
+    DATA_FIRST_DELAY = 15
+    WEATHER_RELOAD_TIME = 3600
+    TEMPS_RELOAD_TIME = 300
+    ALERTS_REFRESH_TIME = 0.05
+    WEATHER_COLUMN_WIDTH = 60
+    HOURLY_HOURS = 24
+    HOURLY_STRIDE = 3
+    CHART_LABEL_LEFT = 135
+    CHART_LEFT = 157
+    CHART_GAP = 3
 
     def __init__(self, 
                  cameras: List[JarvisCamera],
@@ -99,29 +92,51 @@ class SharpDisplayClock:
                  refresh_delay_millis: int=1000, 
                  start_screen: Screens=Screens.Weather,
                  calendar_reload_time=3600,
-                 disable_calendar: bool=False
+                 disable_calendar: bool=False,
+                 stream_camera: bool=True,
+                 autostart: bool=True,
+                 backend: DisplayBackend=None,
+                 use_framebuffer: Optional[bool]=None
                  ):
+        """backend makes the displays and buttons, SHARP_DISPLAY_BACKEND's if not given.
+
+        use_framebuffer draws
+        the clock straight into a SharpFramebuffer rather than a PIL image on
+        screens that allow it, by default only when NumPy is there to do the
+        blits.
+        """
         self.cameras = cameras
         self.photo = None
+        self.stream_camera = stream_camera
+        self.last_stream_frame = 0
         self.screen_enabled = start_screen
+        self.weather_view = WeatherView.Daily
         self.update_delay = refresh_delay_millis
-        self.last_updated = datetime.now()
         self.calendar_reload_time = calendar_reload_time
         self.display_weather = not disable_weather
         self.disable_calendar = disable_calendar
         self.openWeather = OpenWeather.OpenWeather()
-        self.last_temp = ""
         self.jarvis = Jarvis.Jarvis()
-        self.inky_calendar = InkyCalendar()
-        self.inky_impression_buttons = InkyImpression(
+        if backend is None:
+            backend = backend_from_env()
+        self.backend = backend
+        self.inky_calendar = InkyCalendar(inky=backend.create_inky())
+        self.refresh_worker = RefreshWorker()
+        self.inky_impression_buttons = backend.create_buttons(
             button1_function = self.button1_function, 
             button2_function = self.button2_function, 
             button3_function = self.button3_function, 
             button4_function = self.button4_function)
-        self.spi = busio.SPI(board.SCK, MOSI=board.MOSI)
-        self.scs = digitalio.DigitalInOut(board.D4)
-        self.display = adafruit_sharpmemorydisplay.SharpMemoryDisplay(self.spi, self.scs, self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
-        self.log_timer = None
+        self.display = backend.create_sharp_display(self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+        self.frame_diff = FrameDiff(self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+        self.framebuffer = SharpFramebuffer(self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+        if use_framebuffer is None:
+            # row at a time in pure Python the blits lose to PIL's paste
+            use_framebuffer = self.framebuffer.rows is not None
+        self.use_framebuffer = use_framebuffer
+        # the static layers packed into the framebuffer layout, kept with the image they came from
+        self.packed_bases = {}
+        self.line_writer = SharpLineWriter(self.display)
         self.logging_interval = refresh_delay_millis
         self.run = True
         self.tiny_text_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansCondensed-Bold.ttf", self.TINY_FONTSIZE)
@@ -134,6 +149,14 @@ class SharpDisplayClock:
         self.panel_top = 160 - 14
         self.panel_height = 225
 
+        # 24h above the week, sharing the House panel right of the min/max text
+        chart_height = (self.panel_height - self.panel_top - self.CHART_GAP) // 2
+        chart_size = (self.SCREEN_WIDTH - self.CHART_LEFT, chart_height)
+        self.temps_charts = (
+            ('24h', LineChart(chart_size, DAY)),
+            ('7d', LineChart(chart_size, WEEK)),
+        )
+
         self.rgb_font_color = self.RGB_WHITE
         if self.font_color == self.BLACK:
             self.rgb_font_color = self.RGB_BLACK
@@ -144,34 +167,122 @@ class SharpDisplayClock:
 
         self.display_dots = True
 
+        self.clock_glyphs = GlyphCache(self.clock_font, self.font_color)
+        self.clock_glyphs.preload(str(hour) for hour in range(1, 13))
+        self.clock_glyphs.preload(f'{minute:02d}' for minute in range(60))
+        self.text_glyphs = GlyphCache(self.text_font, self.font_color)
+        self.text_glyphs.preload(['am', 'pm'])
+        self.tiny_text_glyphs = GlyphCache(self.tiny_text_font, self.font_color)
+        self.dot_tile = self.render_dot_tile()
+
+        self.layer_cache = LayerCache((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), self.MONO_PALETTE, self.bg_color)
+        self.screen_layers = {
+            Screens.Weather: ScreenLayers(
+                static=[
+                    Layer(self.draw_weather, lambda: (self.refresh_worker.snapshot.weather_version, self.weather_view)),
+                    Layer(lambda draw: self.page_selected(draw, Screens.Weather))
+                ]
+            ),
+            Screens.House: ScreenLayers(
+                static=[
+                    Layer(self.draw_house, lambda: self.refresh_worker.snapshot.temps_version),
+                    Layer(lambda draw: self.page_selected(draw, Screens.House))
+                ]
+            ),
+            Screens.Alerts: ScreenLayers(
+                static=[Layer(lambda draw: self.page_selected(draw, Screens.Alerts))],
+                dynamic=[Layer(self.draw_alerts)]
+            ),
+            Screens.Settings: ScreenLayers(
+                static=[
+                    Layer(self.draw_settings, lambda: self.next_calendar_reload),
+                    Layer(lambda draw: self.page_selected(draw, Screens.Settings))
+                ]
+            ),
+        }
+
         self.inky_impression_buttons.bind_button_events()
 
         self.clear_screen()
-        self.next_calendar_reload = datetime.now() + timedelta(seconds=15)
+        self.next_calendar_reload = datetime.now() + timedelta(seconds=self.DATA_FIRST_DELAY)
 
-        self.timer = InfiniteTimer(self.logging_interval, self.update)
-        self.timer.start()
+        self.scheduler = Scheduler()
+        self.scheduler.add_job('clock', self.logging_interval / 1000, self.update)
+        if self.display_weather:
+            self.scheduler.add_job('weather', self.WEATHER_RELOAD_TIME, self.update_weather, first_delay=self.DATA_FIRST_DELAY)
+        self.scheduler.add_job('temps', self.TEMPS_RELOAD_TIME, self.update_temps, first_delay=self.DATA_FIRST_DELAY)
+        if self.disable_calendar is not True:
+            self.scheduler.add_job('calendar', self.calendar_reload_time, self.update_calendar, first_delay=self.DATA_FIRST_DELAY)
+        if autostart:
+            self.select_screen(start_screen)
+            self.scheduler.start()
 
     def button1_function(self, pin):
-        self.screen_enabled = Screens.Weather
+        if self.screen_enabled is Screens.Weather:
+            # pressing it again flips between the daily and hourly forecast
+            if self.weather_view is WeatherView.Daily:
+                self.weather_view = WeatherView.Hourly
+            else:
+                self.weather_view = WeatherView.Daily
+        self.select_screen(Screens.Weather)
         print("button 1 pressed")
 
     def button2_function(self, pin):
-        self.screen_enabled = Screens.House
+        self.select_screen(Screens.House)
         print("button 2 pressed")
 
     def button3_function(self, pin):
-        self.screen_enabled = Screens.Alerts
-        self.cameras[0].set_defaults()
+        self.select_screen(Screens.Alerts)
+        if self.cameras:
+            # GPIO callbacks need to return quickly, let the worker talk to the camera
+            self.refresh_worker.submit('camera_settings', self.refresh_camera_settings)
         print("button 3 pressed")
 
     def button4_function(self, pin):
-        self.screen_enabled = Screens.Settings
+        self.select_screen(Screens.Settings)
         print("button 4 pressed")
 
+    def select_screen(self, screen: Screens):
+        self.screen_enabled = screen
+        if not self.cameras or not self.stream_camera:
+            return
+        if screen is Screens.Alerts:
+            self.cameras[0].start_stream()
+            self.last_stream_frame = 0
+            # the clock tick is too slow for video, push new frames as they turn up
+            self.scheduler.add_job('alerts', self.ALERTS_REFRESH_TIME, self.update_alerts)
+        else:
+            self.scheduler.remove_job('alerts')
+            self.cameras[0].stop_stream()
+
     def clear_screen(self):
         self.display.fill(self.bg_color)
         self.display.show()
+        self.frame_diff.commit(self.display.buffer)
+
+    def push_frame(self, image):
+        """Sends a 1-bit frame to the display, only transferring the lines that changed."""
+        frame = image.tobytes()
+        changed_lines = self.frame_diff.changed_lines(frame)
+        if changed_lines:
+            # PIL's packed "1" rows match the display buffer layout, so no need
+            # to walk every pixel through display.image()
+            self.display.buffer[:] = frame
+            self.line_writer.write_lines(changed_lines)
+            self.frame_diff.commit(frame)
+        else:
+            self.line_writer.toggle_vcom()
+
+    def push_framebuffer(self):
+        """Sends the lines of the framebuffer that aren't on the display yet."""
+        changed_lines = self.framebuffer.changed_lines(self.display.buffer)
+        if changed_lines:
+            # the display buffer stays what's on the panel, for push_frame() and the render server
+            self.framebuffer.copy_lines(self.display.buffer, changed_lines)
+            self.line_writer.write_framebuffer(self.framebuffer, changed_lines)
+            self.frame_diff.commit(self.display.buffer)
+        else:
+            self.line_writer.toggle_vcom()
 
     def seconds_length(self, seconds: float):
         length = 0
@@ -182,98 +293,161 @@ class SharpDisplayClock:
         return length
 
     def update(self):
-        now = datetime.now()
-        if now + timedelta(milliseconds=self.update_delay) > self.last_updated:
-            if self.disable_calendar is not True and self.next_calendar_reload < now:
-                self.openWeather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
-                self.last_temp = self.jarvis.get_temps()
-                self.inky_calendar.render_caldav_to_inky()
-                self.next_calendar_reload = now + timedelta(seconds=self.calendar_reload_time)
-            bypass = False
-            if self.screen_enabled is Screens.Alerts:
-                bypass = True
-
-            self.update_clock(bypass)
-        else:
-            self.last_updated = datetime.now()
-            time.sleep(self.update_delay)
+        bypass = False
+        if self.screen_enabled is Screens.Alerts:
+            bypass = True
+
+        self.update_clock(bypass)
+
+    def update_weather(self):
+        self.refresh_worker.submit('weather', self.refresh_weather)
+
+    def update_temps(self):
+        self.refresh_worker.submit('temps', self.refresh_temps)
+
+    def update_calendar(self):
+        self.next_calendar_reload = datetime.now() + timedelta(seconds=self.calendar_reload_time)
+        self.refresh_worker.submit('calendar', self.refresh_calendar)
+
+    def refresh_weather(self):
+        daily_reports = self.openWeather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
+        hourly_reports = self.openWeather.get_report(OpenWeather.WeatherReport.Hourly)
+        # the forecast for the hour we're in onwards, every few hours for the next day
+        this_hour = datetime.now().timestamp() - 3600
+        upcoming = [report for report in hourly_reports if report.dt > this_hour]
+        return {
+            'daily_reports': tuple(daily_reports),
+            'hourly_reports': tuple(upcoming[:self.HOURLY_HOURS:self.HOURLY_STRIDE]),
+            'weather_version': self.openWeather.version
+        }
+
+    def refresh_temps(self):
+        latest_temperature = self.jarvis.get_temps()
+        # drawn here rather than in the render loop, the series keeps
+        # changing under us and the charts only need redoing on new data
+        charts = tuple(
+            (label, chart.render(self.jarvis.temperatures, self.jarvis.version))
+            for label, chart in self.temps_charts
+        )
+        return {
+            'latest_temperature': latest_temperature,
+            'min_temp_24h': self.jarvis.min_temp_24h,
+            'max_temp_24h': self.jarvis.max_temp_24h,
+            'temps_version': self.jarvis.version,
+            'temps_charts': charts
+        }
+
+    def refresh_camera_settings(self):
+        result = self.cameras[0].set_defaults()
+        if not result.ok:
+            print(f'Camera settings failed: {result.failed}')
+
+    def refresh_calendar(self):
+        if not self.inky_calendar.render_calendar_to_inky():
+            return {}
+        return {'calendar_updated': datetime.now()}
 
     def update_clock(self, bypass=False):
-        image = Image.new(self.MONO_PALETTE, (self.display.width, self.display.height), self.bg_color)
+        screen = self.screen_enabled
+        if self.use_framebuffer and not self.screen_layers[screen].dynamic:
+            self.update_framebuffer(screen, bypass)
+            return
+        image = self.layer_cache.compose(self.layer_key(screen), self.screen_layers[screen].static)
         draw = ImageDraw.Draw(image)
         if not bypass:
-            if self.display_dots:
-                draw.ellipse((self.CLOCK_MINUTES_LEFT -5 + 0, 27, self.CLOCK_MINUTES_LEFT -5 + 15, 42), fill=self.font_color, outline=self.bg_color)
-                draw.ellipse((self.CLOCK_MINUTES_LEFT -5 + 0, 67, self.CLOCK_MINUTES_LEFT -5 + 15, 82), fill=self.font_color, outline=self.bg_color)
-                self.display_dots = False
-            else:
-                self.display_dots = True
-
-            current_time = datetime.now()
-            hours = f'{current_time.strftime("%-I")}'
-            minutes = f'{current_time.strftime("%M")}'
-            am_pm = 'am'
-            friendly_date = f'{current_time.strftime("%A")}, {arrow.get(current_time).format("Do")} of {current_time.strftime("%B")}, {current_time.strftime("%Y")}'
-            if current_time.strftime("%p") == "PM":
-                am_pm = 'pm'
-            hours_size_w, hours_size_h = self.clock_font.getsize(hours)
-            friendly_date_size_w, friendly_date_size_h = self.text_font.getsize(friendly_date)
-
-            draw.text(
-                (self.CLOCK_MINUTES_LEFT - hours_size_w, self.CLOCK_TOP),
-                hours,
-                font=self.clock_font,
-                fill=self.font_color
-            )
-
-            draw.text(
-                (self.CLOCK_LEFT + self.CLOCK_MINUTES_LEFT + 16, self.CLOCK_TOP),
-                minutes,
-                font=self.clock_font,
-                fill=self.font_color
-            )
-            draw.text(
-                (self.SCREEN_WIDTH - 50, 0),
-                f'{self.last_temp}°C',
-                font=self.tiny_text_font,
-                fill=self.font_color
-            )
-
-            draw.text(
-                (self.SCREEN_WIDTH - 40, 92),
-                am_pm,
-                font=self.text_font,
-                fill=self.font_color
-            )
-
-            draw.rectangle(
-                (0, 125, self.seconds_length(int(current_time.strftime('%-S'))), 127),
-                fill=self.font_color
-            )
-
-            draw.text(
-                (((self.SCREEN_WIDTH / 2) - (friendly_date_size_w / 2)), 130),
-                friendly_date,
-                font=self.text_font,
-                fill=self.font_color
-            )
+            face = self.clock_face()
+            if face.dots:
+                for top in self.CLOCK_DOT_TOPS:
+                    draw.ellipse(self.dot_box(top), fill=self.font_color, outline=self.bg_color)
+            for glyphs, xy, text in face.text:
+                glyphs.paste(image, xy, text)
+            draw.rectangle(face.seconds_bar, fill=self.font_color)
         self.last_update = datetime.now()
-        self.update_screen(draw, image)
-
-    def update_screen(self, draw, image):
-        self.display_screen(draw)
-        if self.screen_enabled != Screens.Alerts:
-            self.display.image(image)
-            self.display.show()
+        self.update_screen(draw, image, screen)
+
+    def update_framebuffer(self, screen: Screens, bypass: bool=False):
+        """update_clock() without PIL, for screens with nothing but static layers.
+
+        The cached base is packed once into the framebuffer layout, so each
+        tick is a copy of that, the pre-packed tiles blitted on top and the
+        changed lines sent straight out of the framebuffer.
+        """
+        key = self.layer_key(screen)
+        base = self.layer_cache.base(key, self.screen_layers[screen].static)
+        packed = self.packed_bases.get(key)
+        if packed is None or packed[0] is not base:
+            packed = self.packed_bases[key] = (base, self.framebuffer.pack(base))
+        self.framebuffer.load(packed[1])
+        if not bypass:
+            face = self.clock_face()
+            if face.dots:
+                for top in self.CLOCK_DOT_TOPS:
+                    left, top, _, _ = self.dot_box(top)
+                    self.framebuffer.blit(self.dot_tile, left, top)
+            for glyphs, xy, text in face.text:
+                glyphs.blit(self.framebuffer, xy, text)
+            self.framebuffer.fill_rect(*face.seconds_bar, self.font_color)
+        self.last_update = datetime.now()
+        self.push_framebuffer()
+
+    def clock_face(self) -> ClockFace:
+        face = ClockFace(dots=self.display_dots, seconds_bar=(0, 0, 0, 0))
+        self.display_dots = not self.display_dots
+
+        current_time = datetime.now()
+        hours = f'{current_time.strftime("%-I")}'
+        minutes = f'{current_time.strftime("%M")}'
+        am_pm = 'am'
+        friendly_date = f'{current_time.strftime("%A")}, {arrow.get(current_time).format("Do")} of {current_time.strftime("%B")}, {current_time.strftime("%Y")}'
+        if current_time.strftime("%p") == "PM":
+            am_pm = 'pm'
+        hours_size_w, hours_size_h = self.clock_glyphs.size(hours)
+        friendly_date_size_w, friendly_date_size_h = self.text_glyphs.size(friendly_date)
+
+        face.text = [
+            (self.clock_glyphs, (self.CLOCK_MINUTES_LEFT - hours_size_w, self.CLOCK_TOP), hours),
+            (self.clock_glyphs, (self.CLOCK_LEFT + self.CLOCK_MINUTES_LEFT + 16, self.CLOCK_TOP), minutes),
+            (self.tiny_text_glyphs, (self.SCREEN_WIDTH - 50, 0), f'{self.refresh_worker.snapshot.latest_temperature}°C'),
+            (self.text_glyphs, (self.SCREEN_WIDTH - 40, 92), am_pm),
+            (self.text_glyphs, (((self.SCREEN_WIDTH / 2) - (friendly_date_size_w / 2)), 130), friendly_date),
+        ]
+        face.seconds_bar = (0, 125, self.seconds_length(int(current_time.strftime('%-S'))), 127)
+        return face
+
+    def dot_box(self, top: int):
+        left = self.CLOCK_MINUTES_LEFT - 5
+        return (left, top, left + self.CLOCK_DOT_SIZE - 1, top + self.CLOCK_DOT_SIZE - 1)
+
+    def render_dot_tile(self) -> PackedTile:
+        size = (self.CLOCK_DOT_SIZE, self.CLOCK_DOT_SIZE)
+        box = (0, 0, self.CLOCK_DOT_SIZE - 1, self.CLOCK_DOT_SIZE - 1)
+        mask = Image.new(self.MONO_PALETTE, size, 0)
+        ImageDraw.Draw(mask).ellipse(box, fill=1, outline=1)
+        ink = Image.new(self.MONO_PALETTE, size, 0)
+        ImageDraw.Draw(ink).ellipse(box, fill=self.font_color, outline=self.bg_color)
+        return PackedTile(mask, ink)
+
+    def layer_key(self, screen: Screens):
+        """Each weather view keeps its own cached base, so flipping between them is just a copy."""
+        if screen is Screens.Weather:
+            return (screen, self.weather_view)
+        return screen
+
+    def update_screen(self, draw, image, screen):
+        self.display_screen(draw, screen)
+        if screen != Screens.Alerts:
+            self.push_frame(image)
     
-    def page_selected(self, draw):
+    def page_selected(self, draw, screen=None):
+        if screen is None:
+            screen = self.screen_enabled
         page_width = self.SCREEN_WIDTH / len(Screens) 
         page_counter = 0
         for page_name in Screens:
             box_height = 1
             fill_colour = self.font_color
             font_colour = self.font_color
-            if self.screen_enabled == page_name:
+            if screen == page_name:
                 box_height = self.SCREEN_HEIGHT - self.panel_height + 1
                 font_colour = self.bg_color
 
@@ -290,45 +464,19 @@ class SharpDisplayClock:
             page_counter += 1
 
 
-    def display_screen(self, draw):
-        if self.screen_enabled is Screens.Weather:
-            draw = self.draw_weather(draw)
-        elif self.screen_enabled is Screens.House:
-            draw = self.draw_house(draw)
-        elif self.screen_enabled is Screens.Alerts:
-            draw = self.draw_alerts(draw)
-        elif self.screen_enabled is Screens.Settings:
-            draw = self.draw_settings(draw)
-        draw = self.page_selected(draw)  
+    def display_screen(self, draw, screen):
+        """Draws the dynamic layers of a screen, static ones come from the layer cache."""
+        for layer in self.screen_layers[screen].dynamic:
+            layer.draw(draw)
         return draw
 
 
     def draw_weather(self, draw):
         if self.display_weather:
-            weather_left = 0
-            for report in self.openWeather.daily_reports:
-                draw.text(
-                    (weather_left, self.panel_top),
-                    report.weather.unicode_icon,
-                    font=self.weather_font,
-                    fill=self.font_color
-                )
-                draw.text(
-                    (weather_left, self.panel_top + 40),
-                    report.friendly_day,
-                    font=self.text_font,
-                    fill=self.font_color
-                )
-                draw.text(
-                    (weather_left, self.panel_top + 60),
-                    f'{round(report.feels_like.day_c)}°C',
-                    font=self.text_font,
-                    fill=self.font_color
-                )
-                if weather_left < self.SCREEN_WIDTH:
-                    weather_left += 60
-                else:
-                    weather_left = 0
+            if self.weather_view is WeatherView.Hourly:
+                self.draw_hourly_weather(draw)
+            else:
+                self.draw_daily_weather(draw)
         else:
             weather_disabled_message = 'Weather is Disabled'
             message_size_w, message_size_h = self.large_text_font.getsize(weather_disabled_message)
@@ -340,7 +488,60 @@ class SharpDisplayClock:
             )
         return draw
 
+    def draw_daily_weather(self, draw):
+        reports = self.refresh_worker.snapshot.daily_reports
+        for weather_left, report in zip(fit_columns(len(reports), self.SCREEN_WIDTH, self.WEATHER_COLUMN_WIDTH), reports):
+            draw.text(
+                (weather_left, self.panel_top),
+                report.weather.unicode_icon,
+                font=self.weather_font,
+                fill=self.font_color
+            )
+            draw.text(
+                (weather_left, self.panel_top + 40),
+                report.friendly_day,
+                font=self.text_font,
+                fill=self.font_color
+            )
+            draw.text(
+                (weather_left, self.panel_top + 60),
+                f'{round(report.feels_like.day_c)}°C',
+                font=self.text_font,
+                fill=self.font_color
+            )
+        return draw
+
+    def draw_hourly_weather(self, draw):
+        reports = self.refresh_worker.snapshot.hourly_reports
+        for weather_left, report in zip(fit_columns(len(reports), self.SCREEN_WIDTH, self.WEATHER_COLUMN_WIDTH), reports):
+            draw.text(
+                (weather_left, self.panel_top),
+                report.weather.unicode_icon,
+                font=self.weather_font,
+                fill=self.font_color
+            )
+            draw.text(
+                (weather_left, self.panel_top + 40),
+                report.friendly_time,
+                font=self.tiny_text_font,
+                fill=self.font_color
+            )
+            draw.text(
+                (weather_left, self.panel_top + 52),
+                f'{round(report.temp_c)}°C',
+                font=self.tiny_text_font,
+                fill=self.font_color
+            )
+            draw.text(
+                (weather_left, self.panel_top + 64),
+                f'{round(report.pop * 100)}%',
+                font=self.tiny_text_font,
+                fill=self.font_color
+            )
+        return draw
+
     def draw_house(self, draw):
+        snapshot = self.refresh_worker.snapshot
         draw.text(
             (0, self.panel_top),
             f'24h Min:',
@@ -349,7 +550,7 @@ class SharpDisplayClock:
         )
         draw.text(
             (70, self.panel_top),
-            f'{self.jarvis.min_temp_24h}°C',
+            f'{snapshot.min_temp_24h}°C',
             font=self.text_font,
             fill=self.font_color
         )
@@ -362,7 +563,7 @@ class SharpDisplayClock:
         )
         draw.text(
             (70, self.panel_top + 20 ),
-            f'{self.jarvis.max_temp_24h}°C',
+            f'{snapshot.max_temp_24h}°C',
             font=self.text_font,
             fill=self.font_color
         )
@@ -376,19 +577,49 @@ class SharpDisplayClock:
         return draw
 
     def draw_weather_data(self, draw):
+        chart_top = self.panel_top
+        for label, chart in self.refresh_worker.snapshot.temps_charts:
+            draw.text(
+                (self.CHART_LABEL_LEFT, chart_top),
+                label,
+                font=self.tiny_text_font,
+                fill=self.font_color
+            )
+            draw.bitmap((self.CHART_LEFT, chart_top), chart, fill=self.font_color)
+            chart_top += chart.height + self.CHART_GAP
         return draw
 
+    def update_alerts(self):
+        if self.screen_enabled is Screens.Alerts:
+            self.push_stream_frame()
+
+    def push_stream_frame(self) -> bool:
+        frame_number, frame = self.cameras[0].get_stream_frame()
+        if frame is None or frame_number == self.last_stream_frame:
+            return False
+        self.last_stream_frame = frame_number
+        self.photo = frame
+        self.push_frame(frame)
+        return True
+
     def draw_alerts(self, draw):
-        bg_img = Image.new("1", (400, 240))
-        photo = self.cameras[0].get_photo_bw()
+        camera = self.cameras[0]
+        if camera.streaming:
+            if not self.push_stream_frame():
+                self.line_writer.toggle_vcom()
+            return draw
+
+        bg_img = Image.new(self.MONO_PALETTE, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        photo = camera.get_photo_bw()
         if photo is not None:
-            self.photo = bg_img.paste(photo)
-            self.display.image(bg_img)
+            bg_img.paste(photo)
+            self.photo = bg_img
+            self.push_frame(bg_img)
         else:
             sleep = 2
             print(f"Camera returned None, wait for {sleep} seconds")
             time.sleep(sleep)
-        self.display.show()
+            self.line_writer.toggle_vcom()
         return draw
 
     def draw_settings(self, draw):
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Benchmark
+# Description          : Offline render benchmarks using the virtual display backend and recorded fixtures
+
+"""Benchmark module
+
+Runs on any Linux box: the Pi hardware is replaced by the virtual display
+backend and the network sources by the recorded responses in fixtures/.
+Results are written as JSON so they can be kept per commit and compared.
+
+    python benchmark.py --iterations 50 --output bench.json
+"""
+
+import argparse
+import contextlib
+import functools
+import http.server
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image, ImageDraw
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(PATH, "fixtures")
+FIXTURE_WEEK_START = datetime(2026, 10, 12)
+PHOTOS = [os.path.join(PATH, "photossnapshot.jpg"), os.path.join(PATH, "photossnapshot_bw.jpg")]
+
+
+class FixtureServer:
+    """Serves the fixtures directory on localhost, standing in for Jarvis and friends."""
+    def __init__(self, directory: str=FIXTURES):
+        handler = functools.partial(QuietHandler, directory=directory)
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureCamera:
+    """A JarvisCamera that hands out the recorded snapshots, alternating between them."""
+    def __init__(self, photos: List[str]=PHOTOS):
+        from photo_pipeline import PhotoConverter
+        self.converter = PhotoConverter()
+        self.jpegs = []
+        for photo in photos:
+            with open(photo, "rb") as photo_file:
+                self.jpegs.append(photo_file.read())
+        self.count = 0
+        self.streaming = False
+
+    def get_photo_bw(self):
+        self.count += 1
+        return self.converter.convert(self.jpegs[self.count % len(self.jpegs)])
+
+    def set_defaults(self):
+        pass
+
+
+def measure(name: str, function: Callable, iterations: int, setup: Optional[Callable]=None, **extra) -> Dict:
+    """Times function, calling setup (untimed) before every run."""
+    if setup is not None:
+        setup()
+    function()
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.mean(timings), 4),
+    }
+    result.update(extra)
+    return result
+
+
+def create_clock(server: FixtureServer):
+    os.environ.setdefault("OPENWEATHER", "benchmark")
+    os.environ.setdefault("MYLOCATIONLAT", "51.5072")
+    os.environ.setdefault("MYLOCATIONLONG", "-0.1276")
+    os.environ["JARVIS_TEMPS_URL"] = f"{server.url}/jarvis_temps.json"
+
+    from SharpDisplayClock import SharpDisplayClock
+    from display_backends import VirtualBackend, install_font_fallback
+    install_font_fallback()
+    clock = SharpDisplayClock(cameras=[FixtureCamera()], stream_camera=False, autostart=False, backend=VirtualBackend())
+    clock.openWeather.filepath = os.path.join(FIXTURES, "weather_report.json")
+    clock.openWeather.load_weather_data_from_file()
+    clock.openWeather.cache_ttl = float("inf")
+    clock.refresh_worker.publish(**clock.refresh_weather())
+    clock.refresh_worker.publish(**clock.refresh_temps())
+    return clock
+
+
+def benchmark_clock(clock, iterations: int) -> List[Dict]:
+    from SharpDisplayClock import Screens
+    results = []
+    default_path = clock.use_framebuffer
+    for screen in (Screens.Weather, Screens.House, Screens.Settings):
+        clock.screen_enabled = screen
+        spi = clock.display.spi_device
+        # the first tick after switching screen sends the whole new screen,
+        # get that out of the way on both paths so neither counts it
+        for use_framebuffer in (True, False):
+            clock.use_framebuffer = use_framebuffer
+            clock.update_clock()
+        # the same tick drawn into the packed framebuffer and through PIL
+        for suffix, use_framebuffer in (("", True), ("_pil", False)):
+            clock.use_framebuffer = use_framebuffer
+            bytes_before, writes_before = spi.bytes_written, spi.writes
+            result = measure(f"update_clock[{screen.name}]{suffix}", clock.update_clock, iterations)
+            result["spi_bytes_per_tick"] = (spi.bytes_written - bytes_before) // (iterations + 1)
+            result["spi_writes_per_tick"] = (spi.writes - writes_before) // (iterations + 1)
+            results.append(result)
+        clock.use_framebuffer = default_path
+        results.append(measure(
+            f"update_clock[{screen.name}]_static_rebuild",
+            clock.update_clock,
+            iterations,
+            setup=clock.layer_cache.invalidate
+        ))
+
+    size = (clock.SCREEN_WIDTH, clock.SCREEN_HEIGHT)
+    screens = {
+        "draw_weather": clock.draw_weather,
+        "draw_house": clock.draw_house,
+        "draw_settings": clock.draw_settings,
+        "page_selected": clock.page_selected,
+    }
+    for name, draw_screen in screens.items():
+        canvas = {}
+
+        def new_canvas():
+            canvas["draw"] = ImageDraw.Draw(Image.new(clock.MONO_PALETTE, size, clock.bg_color))
+
+        results.append(measure(name, lambda: draw_screen(canvas["draw"]), iterations, setup=new_canvas))
+
+    clock.screen_enabled = Screens.Alerts
+    results.append(measure("draw_alerts", lambda: clock.draw_alerts(None), iterations))
+    return results
+
+
+def load_fixture_events():
+    import icalendar
+    from caldav_calendar import add_ical_events
+    from events import Events
+
+    with open(os.path.join(FIXTURES, "caldav_events.ics")) as ics_file:
+        calendars = icalendar.Calendar.from_ical(ics_file.read(), multiple=True)
+    events = Events(FIXTURE_WEEK_START, FIXTURE_WEEK_START + timedelta(days=31))
+    add_ical_events(events, calendars)
+    return events
+
+
+def benchmark_calendar(inky_calendar, iterations: int) -> List[Dict]:
+    events = load_fixture_events()
+
+    def render_to_inky():
+        inky_calendar.render_events(events)
+        inky_calendar.inky.set_image(inky_calendar.img, saturation=1)
+        inky_calendar.inky.show()
+
+    return [
+        measure("caldav_parse", load_fixture_events, iterations),
+        measure("render_caldav_to_inky", render_to_inky, iterations, events=len(events.events)),
+        measure(
+            "render_caldav_to_inky[all_cells]",
+            render_to_inky,
+            iterations,
+            setup=inky_calendar.invalidate_cells,
+            events=len(events.events)
+        ),
+    ]
+
+
+def benchmark_photos(iterations: int) -> List[Dict]:
+    from benchmark_photo import thumbnail_convert
+    from photo_pipeline import Dither, PhotoConverter
+
+    with open(PHOTOS[0], "rb") as photo_file:
+        jpeg = photo_file.read()
+    results = [measure("format_photo[thumbnail]", lambda: thumbnail_convert(jpeg), iterations)]
+    for dither in Dither:
+        converter = PhotoConverter(dither=dither)
+        results.append(measure(f"format_photo[{dither.name}]", lambda: converter.convert(jpeg), iterations))
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=PATH, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations: int) -> Dict:
+    server = FixtureServer()
+    server.start()
+    try:
+        clock = create_clock(server)
+        results = benchmark_clock(clock, iterations)
+        results += benchmark_calendar(clock.inky_calendar, iterations)
+        results += benchmark_photos(iterations)
+        clock.refresh_worker.shutdown()
+    finally:
+        server.stop()
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline render benchmarks")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    # the modules under test print as they go, keep that out of the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args.iterations)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
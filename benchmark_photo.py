@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Photo Benchmark
+# Description          : Per frame cost of turning a camera JPEG into a 1-bit display frame
+
+"""Photo benchmark module"""
+
+import argparse
+import os
+import time
+from io import BytesIO
+from typing import Callable, Dict
+
+from PIL import Image
+
+from photo_pipeline import Dither, PhotoConverter
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PHOTO = os.path.join(PATH, "photossnapshot.jpg")
+FRAME_SIZE = (400, 240)
+
+
+def thumbnail_convert(jpeg: bytes) -> Image.Image:
+    """The original JarvisCamera.format_photo path: full decode, thumbnail, crop, convert."""
+    preferred_width, preferred_height = FRAME_SIZE
+    im = Image.open(BytesIO(jpeg))
+    im.thumbnail((preferred_width, 400))
+    actual_width, actual_height = im.size
+    height_remainder = actual_height - preferred_height
+    top = height_remainder / 2
+    bottom = actual_height - (height_remainder / 2)
+    im = im.crop((0, top, preferred_width, bottom))
+    return im.convert('1')
+
+
+def time_per_frame(convert: Callable[[bytes], Image.Image], jpeg: bytes, iterations: int) -> float:
+    convert(jpeg)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        convert(jpeg)
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def benchmark_photo(photo_path: str=DEFAULT_PHOTO, iterations: int=50) -> Dict[str, float]:
+    """Returns the milliseconds per frame for the old path and each pipeline dither."""
+    with open(photo_path, "rb") as photo_file:
+        jpeg = photo_file.read()
+    results = {"thumbnail": time_per_frame(thumbnail_convert, jpeg, iterations)}
+    for dither in Dither:
+        converter = PhotoConverter(FRAME_SIZE, dither)
+        results[f"pipeline_{dither.name.lower()}"] = time_per_frame(converter.convert, jpeg, iterations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera JPEG to 1-bit frame benchmark")
+    parser.add_argument("--photo", default=DEFAULT_PHOTO)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    for name, ms in benchmark_photo(args.photo, args.iterations).items():
+        print(f"{name:30} {ms:8.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,82 @@ import sys
 from time import sleep
 from datetime import datetime, timezone, timedelta, time
 from events import Events
+from calendar_sync import CalendarSyncState, expand_events, sync_calendar
 
 ## We'll try to use the local caldav library, not the system-installed
 sys.path.insert(0, '..')
 sys.path.insert(0, '.')
 
 import caldav
+from caldav.lib import error
+
+
+def add_ical_events(events: Events, icalendar_instances):
+    """Adds the events in each parsed iCalendar object to events.
+
+    Servers don't agree on how they split things between subcomponents, so
+    every subcomponent's properties get mixed into one set before picking
+    out the ones we care about.
+    """
+    for icalendar_instance in icalendar_instances:
+        summary = ""
+        start = None
+        end = None
+        end_dt = None
+        duration = ""
+        event = {'SUMMARY':'', 'DESCRIPTION':'', 'DTSTART':'', 'DTEND':'', 'DURATION':'', 'UID':''}
+        for event_list in icalendar_instance.subcomponents:
+            for event_item in event_list:
+                if event_item in event:
+                    event[event_item] = event_list[event_item]
+        skip = False
+        if 'SUMMARY' in event and event['SUMMARY'] != '': 
+            summary = event['SUMMARY']
+        if not summary and 'DESCRIPTION' in event and event['DESCRIPTION'] != '':
+            summary = event['DESCRIPTION']
+        if 'DTSTART' in event and hasattr(event['DTSTART'],'dt') and event['DTSTART'].dt:
+            if event['DTSTART'].dt not in events.dates:
+                skip = True
+            start = event['DTSTART'].dt
+        else:
+            print('aha!')
+        if 'DTEND' in event and hasattr(event['DTEND'],'dt') and event['DTEND'].dt:
+            end = event['DTEND'].dt
+        if 'DURATION' in event and event['DURATION'] != '':
+            duration = event['DURATION']
+        if start and end:
+            end_dt = end
+        elif start and duration: 
+            end_dt = start + duration.dt
+        
+        if summary and start and end_dt:
+            events.add_event(start=start, end=end_dt, title=summary, description=None, uid=str(event['UID']) or None)
+
+
+def calendar_window():
+    """The span the Inky shows: midnight on this week's Monday and the 31 days after."""
+    today = datetime.today()
+    week_start = today - timedelta(days=today.weekday())
+    week_start_min = datetime.combine(week_start, time.min)
+    return week_start_min, week_start + timedelta(days=+31)
 
 
 class CalDav_Calendar:
-    def __init__(self):
+    # principal and calendar URLs rarely change, no need to look them up every refresh
+    DISCOVERY_TTL = 24 * 60 * 60
+    RETRY_ATTEMPTS = 5
+    RETRY_DELAY = 1
+    RETRY_MAX_DELAY = 16
+
+    def __init__(self, incremental: bool=True, sync_filepath: str="calendar_sync.json"):
         self.events = []
-        self.get_attempt = 0
+        # incremental keeps a copy of the calendar on disk and only asks the
+        # server for what changed since last time (RFC 6578 sync-collection)
+        self.incremental = incremental
+        self.sync_state = CalendarSyncState(sync_filepath)
+        self.changed = True
+        self.window_start = None
+        self.synced_events = None
 
         if os.environ.get('CALENDARURL') is None:
             raise EnvironmentError(f'Failed because CALENDARURL envar is not set')
@@ -28,77 +92,84 @@ class CalDav_Calendar:
             raise EnvironmentError(f'Failed because CALENDARPASSWORD envar is not set')
         self.caldav_password = os.environ.get('CALENDARPASSWORD')
 
+        # one client for the life of the calendar so its connection is kept alive
+        self.client = caldav.DAVClient(
+            url=self.caldav_url,
+            username=self.caldav_username,
+            password=self.caldav_password
+        )
+        self.calendars = []
         self.calendar = None
         self.month_events = None
         self.get_calendar()
 
+    def with_retries(self, request):
+        """Calls request, backing off 1s, 2s, 4s... between failures before giving up."""
+        delay = self.RETRY_DELAY
+        for attempt in range(1, self.RETRY_ATTEMPTS + 1):
+            try:
+                return request()
+            except (error.DAVError, OSError) as err:
+                if isinstance(err, error.NotFoundError):
+                    # the calendar has moved, find it again next time round
+                    self.sync_state.forget_discovery()
+                if attempt == self.RETRY_ATTEMPTS:
+                    raise
+                print(f'Calendar request failed ({err}), retrying in {delay}s')
+                sleep(delay)
+                delay = min(delay * 2, self.RETRY_MAX_DELAY)
+
+    def discover_calendars(self):
+        calendar_urls = self.sync_state.discovered_calendars(self.caldav_url, self.DISCOVERY_TTL)
+        if calendar_urls is not None:
+            return [self.client.calendar(url=url) for url in calendar_urls]
+
+        principal = self.client.principal()
+        calendars = principal.calendars()
+        if not calendars:
+            raise error.NotFoundError(f'No calendars found at {self.caldav_url}')
+        self.sync_state.remember_discovery(
+            self.caldav_url,
+            str(principal.url),
+            [str(calendar.url) for calendar in calendars]
+        )
+        return calendars
+
     def get_calendar(self):
-        with caldav.DAVClient(  url=self.caldav_url, 
-                                username=self.caldav_username, 
-                                password=self.caldav_password
-                            ) as client:
-            my_principal = client.principal()
-            self.calendars = my_principal.calendars()
-            self.get_attempt += 1
-
-        if self.calendars is None and self.get_attempt < 10:
-            sleep(1)
-            self.get_calendar()
-        else:
-            self.get_attempt = 0
-            self.calendar = self.calendars[0]
+        self.with_retries(self.load_calendar)
+
+    def load_calendar(self):
+        self.calendars = self.discover_calendars()
+        self.calendar = self.calendars[0]
+        week_start_min, then = calendar_window()
+
+        if self.incremental:
+            # every calendar is synced, even if just one of them changed the
+            # events get rebuilt from what's stored so nothing is fetched twice
+            changes = [sync_calendar(calendar, self.sync_state) for calendar in self.calendars]
+            self.changed = any(changes)
+            if self.changed or self.window_start != week_start_min or self.synced_events is None:
+                self.changed = True
+                self.window_start = week_start_min
+                self.synced_events = Events(week_start_min, then)
+                calendar_urls = [str(calendar.url) for calendar in self.calendars]
+                add_ical_events(self.synced_events, expand_events(self.sync_state, week_start_min, then, urls=calendar_urls))
+            self.events = self.synced_events
+            return
 
-        today = datetime.today()
-        week_start = today - timedelta(days=today.weekday())
-        week_start_min = midnight_today = datetime.combine(week_start, time.min)
-        then = week_start + timedelta(days=+31)
         events = Events(week_start_min, then)
-
-        # start = datetime.now()
-        # end = start + timedelta(days=+21)
-
-        self.month_events = self.calendar.search(
-            start=week_start_min,
-            end=then,
-            event=True,
-            expand=True,
-        )
-
-        for event_collection in self.month_events:
-            summary = ""
-            start = None
-            end = None
-            duration = ""
-            event = {'SUMMARY':'', 'DESCRIPTION':'', 'DTSTART':'', 'DTEND':'', 'DURATION':''}
-            for event_list in event_collection.icalendar_instance.subcomponents:
-                for event_item in event_list:
-                    if event_item in event:
-                        event[event_item] = event_list[event_item]
-            skip = False
-            if 'SUMMARY' in event and event['SUMMARY'] != '': 
-                summary = event['SUMMARY']
-            if not summary and 'DESCRIPTION' in event and event['DESCRIPTION'] != '':
-                summary = event['DESCRIPTION']
-            if 'DTSTART' in event and hasattr(event['DTSTART'],'dt') and event['DTSTART'].dt:
-                if event['DTSTART'].dt not in events.dates:
-                    skip = True
-                start = event['DTSTART'].dt
-            else:
-                print('aha!')
-            if 'DTEND' in event and hasattr(event['DTEND'],'dt') and event['DTEND'].dt:
-                end = event['DTEND'].dt
-            if 'DURATION' in event and event['DURATION'] != '':
-                duration = event['DURATION']
-            if start and end:
-                end_dt = end
-            elif start and duration: 
-                end_dt = start + duration.dt
-            
-            if summary and start and end_dt:
-                events.add_event(start=start, end=end_dt, title=summary, description=None)
-        #self.events = events.events.sort(key = start)
-        self.calendar.events = events
-        
+        self.month_events = []
+        for calendar in self.calendars:
+            self.month_events += calendar.search(
+                start=week_start_min,
+                end=then,
+                event=True,
+                expand=True,
+            )
+
+        add_ical_events(events, (event_collection.icalendar_instance for event_collection in self.month_events))
+        self.events = events
+        self.changed = True
 
     def print_events(self):
         if len(self.events.events) > 0:
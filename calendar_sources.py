@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Calendar Sources
+# Description          : CalDAV, Google and .ics calendars behind one interface,
+#                      : fetched together and merged into a single Events
+
+"""CalendarSources module"""
+
+import abc
+import os
+from datetime import datetime, time
+from typing import Dict, Iterable, List
+
+import icalendar
+
+import http_client
+from caldav_calendar import CalDav_Calendar, add_ical_events, calendar_window
+from calendar_sync import expand_ical
+from events import Event, Events, to_date
+
+
+class CalendarSource(abc.ABC):
+    """Somewhere events come from, fetch() returns them as an Events for the calendar window."""
+    name = "calendar"
+
+    @abc.abstractmethod
+    def fetch(self) -> Events:
+        pass
+
+
+class CalDavSource(CalendarSource):
+    """Every calendar on the CALENDARURL server, synced incrementally."""
+    name = "caldav"
+
+    def __init__(self, incremental: bool=True, sync_filepath: str="calendar_sync.json"):
+        self.incremental = incremental
+        self.sync_filepath = sync_filepath
+        self.calendar = None
+
+    def fetch(self) -> Events:
+        # created on first use, it logs in and syncs as soon as it's made
+        if self.calendar is None:
+            self.calendar = CalDav_Calendar(incremental=self.incremental, sync_filepath=self.sync_filepath)
+        else:
+            self.calendar.get_calendar()
+        return self.calendar.events
+
+
+class GoogleSource(CalendarSource):
+    """The primary Google calendar, needs credentials.json/token.json (see gcal.py)."""
+    name = "google"
+
+    def __init__(self):
+        self.calendar = None
+
+    def fetch(self) -> Events:
+        # the Google client libraries are only needed if this source is used
+        from gcal import Google_Calendar
+        if self.calendar is None:
+            self.calendar = Google_Calendar()
+        else:
+            self.calendar.get_calendar()
+        return self.calendar.events
+
+
+class IcsFileSource(CalendarSource):
+    """A local .ics file, e.g. an exported holidays calendar, only re-read when it changes."""
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.name = f"ics:{filepath}"
+        self.loaded = None
+        self.events = None
+
+    def fetch(self) -> Events:
+        week_start_min, then = calendar_window()
+        loaded = (os.path.getmtime(self.filepath), week_start_min)
+        if loaded == self.loaded:
+            return self.events
+
+        with open(self.filepath, "rb") as ics_file:
+            calendars = icalendar.Calendar.from_ical(ics_file.read(), multiple=True)
+        events = Events(week_start_min, then)
+        for ical in calendars:
+            add_ical_events(events, expand_ical(ical, week_start_min, then))
+        self.loaded = loaded
+        self.events = events
+        return events
+
+
+def sources_from_env(default: str="caldav") -> List[CalendarSource]:
+    """Builds the sources listed in CALENDAR_SOURCES, e.g. "caldav,google,ics:/home/pi/holidays.ics"."""
+    sources = []
+    for entry in os.environ.get('CALENDAR_SOURCES', default).split(','):
+        entry = entry.strip()
+        if entry == CalDavSource.name:
+            sources.append(CalDavSource())
+        elif entry == GoogleSource.name:
+            sources.append(GoogleSource())
+        elif entry.startswith('ics:'):
+            sources.append(IcsFileSource(entry[len('ics:'):]))
+        elif entry:
+            raise EnvironmentError(f'Failed because CALENDAR_SOURCES has an unknown source: {entry}')
+    return sources
+
+
+def is_all_day(event: Event) -> bool:
+    """CalDAV all day events start on a date, Google's on a midnight datetime."""
+    if not isinstance(event.start, datetime):
+        return True
+    return event.start.time() == time() and isinstance(event.end, datetime) and event.end.time() == time() and event.end > event.start
+
+
+def merge_events(start: datetime, end: datetime, sources_events: Iterable[Events]) -> Events:
+    """One Events holding every source's events, each event only once.
+
+    The same event turns up twice when it's shared between calendars, so
+    events are matched on their UID and start (recurring events share a
+    UID), or on title and times if they don't have a UID. All day events
+    are matched on their start date, as sources don't agree on whether
+    that's a date or a midnight datetime.
+    """
+    merged = Events(start, end)
+    seen = set()
+    for events in sources_events:
+        for event in events.events:
+            start = to_date(event.start) if is_all_day(event) else event.start
+            if event.uid:
+                key = (event.uid, start)
+            else:
+                key = (event.title, start, to_date(event.end) if is_all_day(event) else event.end)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.add_event(start=event.start, end=event.end, title=event.title, description=event.description, uid=event.uid)
+    return merged
+
+
+class CalendarSources:
+    """Fetches every source at once and merges the results.
+
+    A refresh takes as long as the slowest source, and a source that fails
+    keeps its last good events on the calendar instead of them vanishing.
+    """
+    def __init__(self, sources: List[CalendarSource]):
+        self.sources = sources
+        self.last_events: Dict[str, Events] = {}
+
+    def fetch(self) -> Events:
+        results = http_client.fetch_all({source.name: source.fetch for source in self.sources})
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                print(f'Calendar source {name} failed: {result}')
+            else:
+                self.last_events[name] = result
+        if not self.last_events:
+            raise ConnectionError('No calendar source could be fetched')
+
+        week_start_min, then = calendar_window()
+        return merge_events(
+            week_start_min,
+            then,
+            (self.last_events[source.name] for source in self.sources if source.name in self.last_events)
+        )
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Calendar Sync
+# Description          : Incremental CalDAV sync (RFC 6578 sync-collection) with
+#                      : the collection state kept on disk between runs
+
+"""CalendarSync module"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import icalendar
+import recurring_ical_events
+from caldav.elements import dav
+from caldav.elements.base import ValuedBaseElement
+from caldav.lib import error
+
+
+class GetCTag(ValuedBaseElement):
+    tag = "{http://calendarserver.org/ns/}getctag"
+
+
+class CalendarSyncState:
+    """What we know about each calendar: its ctag, sync token and every event's etag and data.
+
+    Kept as JSON next to the weather cache so a restart carries on syncing
+    from where it left off instead of fetching the whole calendar again.
+    The principal and calendar URLs found at login are kept here too.
+    """
+    def __init__(self, filepath: str="calendar_sync.json"):
+        self.filepath = filepath
+        self.calendars: Dict[str, dict] = {}
+        self.discovery: Dict[str, object] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath) as sync_file:
+                saved = json.load(sync_file)
+            self.calendars = saved.get('calendars', {})
+            self.discovery = saved.get('discovery', {})
+        except (OSError, ValueError) as err:
+            print(f'Calendar sync state unreadable, starting again: {err}')
+            self.calendars = {}
+            self.discovery = {}
+
+    def save(self):
+        temp_filepath = f'{self.filepath}.tmp'
+        with open(temp_filepath, 'w') as sync_file:
+            json.dump({'calendars': self.calendars, 'discovery': self.discovery}, sync_file)
+        os.replace(temp_filepath, self.filepath)
+
+    def calendar(self, url: str) -> dict:
+        return self.calendars.setdefault(url, {'ctag': None, 'sync_token': None, 'objects': {}})
+
+    def discovered_calendars(self, server_url: str, max_age: float) -> Optional[List[str]]:
+        """The calendar URLs found for server_url, unless they're older than max_age seconds."""
+        if self.discovery.get('server_url') != server_url or not self.discovery.get('calendars'):
+            return None
+        if time.time() - self.discovery.get('discovered_at', 0) > max_age:
+            return None
+        return list(self.discovery['calendars'])
+
+    def remember_discovery(self, server_url: str, principal_url: str, calendar_urls: List[str]):
+        self.discovery = {
+            'server_url': server_url,
+            'principal': principal_url,
+            'calendars': calendar_urls,
+            'discovered_at': time.time(),
+        }
+        self.save()
+
+    def forget_discovery(self):
+        self.discovery = {}
+
+
+def sync_calendar(calendar, state: CalendarSyncState) -> bool:
+    """Brings the stored copy of calendar up to date, returns True if anything changed.
+
+    The ctag is checked first, one cheap PROPFIND, and if it hasn't moved
+    nothing else is asked for. Otherwise a sync-collection REPORT with the
+    stored token only returns the events added, changed or deleted since.
+    """
+    entry = state.calendar(str(calendar.url))
+    try:
+        ctag = calendar.get_property(GetCTag())
+    except error.DAVError:
+        ctag = None
+    if ctag is not None and ctag == entry['ctag'] and entry['sync_token']:
+        return False
+
+    token = entry['sync_token']
+    try:
+        collection = calendar.objects_by_sync_token(sync_token=token, load_objects=True)
+    except error.NotFoundError:
+        raise
+    except error.DAVError as err:
+        # the server has forgotten our token, start again with everything
+        print(f'Calendar sync token rejected, doing a full sync: {err}')
+        token = None
+        collection = calendar.objects_by_sync_token(sync_token=None, load_objects=True)
+
+    new_token = str(collection.sync_token) if collection.sync_token else None
+    # without a token, or when caldav had to fall back to listing everything
+    # (its tokens are then prefixed fake-), we've been given the whole
+    # calendar. An unchanged listing keeps its fake token and comes back
+    # empty, that's nothing new rather than an empty calendar.
+    full_listing = token is None or ((new_token or '').startswith('fake-') and new_token != token)
+    # a full listing replaces what we had, even if it's empty now
+    objects = {} if full_listing else dict(entry['objects'])
+    for calendar_object in collection.objects:
+        url = str(calendar_object.url)
+        data = calendar_object.data
+        if data is None:
+            objects.pop(url, None)
+        else:
+            objects[url] = {
+                'etag': calendar_object.props.get(dav.GetEtag.tag),
+                'data': data,
+            }
+
+    changed = objects != entry['objects']
+    entry['objects'] = objects
+    entry['ctag'] = ctag
+    entry['sync_token'] = new_token
+    state.save()
+    return changed
+
+
+def expand_ical(ical: icalendar.Calendar, start: datetime, end: datetime) -> Iterator[icalendar.Calendar]:
+    """Yields one iCalendar object per event occurrence between start and end."""
+    for component in recurring_ical_events.of(ical).between(start, end):
+        occurrence = icalendar.Calendar()
+        occurrence.add_component(component)
+        yield occurrence
+
+
+def expand_events(state: CalendarSyncState, start: datetime, end: datetime, urls=None) -> Iterator[icalendar.Calendar]:
+    """Yields one iCalendar object per event occurrence between start and end.
+
+    Recurring events are stored as their master copy and expanded here,
+    so moving on a week doesn't need anything from the server.
+    """
+    for url, entry in state.calendars.items():
+        if urls is not None and url not in urls:
+            continue
+        for stored_object in entry['objects'].values():
+            try:
+                occurrences = list(expand_ical(icalendar.Calendar.from_ical(stored_object['data']), start, end))
+            except Exception as err:
+                print(f'Could not expand calendar event: {err}')
+                continue
+            yield from occurrences
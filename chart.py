@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Chart
+# Description          : 1-bit line charts of a time series, decimated to one
+#                      : min/max/first/last per pixel column (M4)
+
+"""Chart module"""
+
+import math
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@dataclass
+class Columns:
+    """One entry per pixel column, NaN where the column has no readings."""
+    first: array
+    last: array
+    low: array
+    high: array
+
+    def __len__(self) -> int:
+        return len(self.first)
+
+
+def decimate(timestamps, values, start: float, end: float, width: int) -> Columns:
+    """M4 reduces the readings between start and end to width columns.
+
+    Keeping the first, last, lowest and highest reading of each column is
+    enough to draw exactly the same line as every reading would, so what
+    comes after this only depends on the width, not how many readings.
+    """
+    nan = float('nan')
+    columns = Columns(*(array('d', [nan]) * width for _ in range(4)))
+    first_index = bisect_right(timestamps, start)
+    if first_index >= len(values) or end <= start:
+        return columns
+    scale = width / (end - start)
+
+    if numpy is not None:
+        times = numpy.frombuffer(timestamps, dtype=numpy.float64)[first_index:]
+        readings = numpy.frombuffer(values, dtype=numpy.float64)[first_index:]
+        column_of = numpy.minimum(((times - start) * scale).astype(numpy.int64), width - 1)
+        # readings are in time order, so each column is one run
+        starts = numpy.flatnonzero(numpy.r_[True, column_of[1:] != column_of[:-1]])
+        ends = numpy.r_[starts[1:], len(readings)] - 1
+        used = column_of[starts]
+        for name, reduced in (
+            ('first', readings[starts]),
+            ('last', readings[ends]),
+            ('low', numpy.minimum.reduceat(readings, starts)),
+            ('high', numpy.maximum.reduceat(readings, starts)),
+        ):
+            column_values = numpy.frombuffer(getattr(columns, name), dtype=numpy.float64)
+            column_values[used] = reduced
+        return columns
+
+    for index in range(first_index, len(values)):
+        column = min(int((timestamps[index] - start) * scale), width - 1)
+        value = values[index]
+        if math.isnan(columns.first[column]):
+            columns.first[column] = columns.low[column] = columns.high[column] = value
+        else:
+            if value < columns.low[column]:
+                columns.low[column] = value
+            if value > columns.high[column]:
+                columns.high[column] = value
+        columns.last[column] = value
+    return columns
+
+
+class LineChart:
+    """Draws the last window seconds of a series as a 1-bit line chart.
+
+    Each column's low to high is drawn as a vertical bar and joined to the
+    next column's first reading, which is the min/max band at week scale
+    and an ordinary line at day scale. The result is a mask (line set) to
+    draw with ImageDraw.bitmap, and is kept until the data version changes.
+    """
+    def __init__(self, size: Tuple[int, int], window: float):
+        self.size = size
+        self.window = window
+        self.version = None
+        self.image = None
+
+    def render(self, series, version=None) -> Image.Image:
+        if version is not None and version == self.version and self.image is not None:
+            return self.image
+        width, height = self.size
+        image = Image.new("1", self.size, 0)
+        draw = ImageDraw.Draw(image)
+        end = series.latest_timestamp
+        if end is not None:
+            columns = decimate(series.timestamps, series.values, end - self.window, end, width)
+            self.draw_columns(draw, columns, height)
+        self.image = image
+        self.version = version
+        return image
+
+    def draw_columns(self, draw: ImageDraw.ImageDraw, columns: Columns, height: int):
+        lows = [value for value in columns.low if not math.isnan(value)]
+        if not lows:
+            return
+        low = min(lows)
+        high = max(value for value in columns.high if not math.isnan(value))
+        # flat series sit in the middle rather than dividing by zero
+        span = (high - low) or 1.0
+        offset = 0.0 if high > low else (height - 1) / 2
+        scale = (height - 1) / span
+
+        def y(value: float) -> int:
+            return round(height - 1 - offset - (value - low) * scale)
+
+        previous: Optional[int] = None
+        for x in range(len(columns)):
+            if math.isnan(columns.first[x]):
+                continue
+            if previous is not None:
+                draw.line((previous, y(columns.last[previous]), x, y(columns.first[x])), fill=255)
+            draw.line((x, y(columns.low[x]), x, y(columns.high[x])), fill=255)
+            previous = x
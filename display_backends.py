@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Display Backends
+# Description          : Where the Sharp display, Inky and buttons come from: the
+#                      : real hardware, PNG files or just memory
+
+"""DisplayBackends module"""
+
+import abc
+import os
+from typing import Callable, Optional
+
+from PIL import Image, ImageFont
+
+FALLBACK_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+# the Sharp 2.7" panel
+SHARP_WIDTH = 400
+SHARP_HEIGHT = 240
+# the BCM pins of the Inky Impression's buttons, A to D
+BUTTON_PINS = (5, 6, 16, 24)
+
+
+class DisplayBackend(abc.ABC):
+    """Makes the Sharp display, Inky and buttons the clock and calendar use.
+
+    create_sharp_display() returns something like adafruit's
+    SharpMemoryDisplay (buffer, spi_device, fill(), show()), create_inky()
+    like inky_uc8159.Inky and create_buttons() like InkyImpression.
+    """
+    name = None
+
+    @abc.abstractmethod
+    def create_sharp_display(self, width: int, height: int):
+        pass
+
+    @abc.abstractmethod
+    def create_inky(self):
+        pass
+
+    @abc.abstractmethod
+    def create_buttons(self, button1_function: Callable, button2_function: Callable, button3_function: Callable, button4_function: Callable):
+        pass
+
+
+class HardwareBackend(DisplayBackend):
+    """The real thing, the Pi modules are only imported once they're asked for."""
+    name = 'hardware'
+
+    def create_sharp_display(self, width: int, height: int):
+        import board
+        import busio
+        import digitalio
+        import adafruit_sharpmemorydisplay
+        spi = busio.SPI(board.SCK, MOSI=board.MOSI)
+        scs = digitalio.DigitalInOut(board.D4)
+        return adafruit_sharpmemorydisplay.SharpMemoryDisplay(spi, scs, width, height)
+
+    def create_inky(self):
+        from inky.inky_uc8159 import Inky
+        # To simulate:
+        #from inky.mock import InkyMockImpression as Inky
+        return Inky()
+
+    def create_buttons(self, button1_function: Callable, button2_function: Callable, button3_function: Callable, button4_function: Callable):
+        from InkyImpression import InkyImpression
+        return InkyImpression(button1_function, button2_function, button3_function, button4_function)
+
+
+class CountingSPIDevice:
+    """Counts what would have gone over the SPI bus."""
+    def __init__(self):
+        self.bytes_written = 0
+        self.transactions = 0
+        self.writes = 0
+
+    def __enter__(self):
+        self.transactions += 1
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def write(self, buffer):
+        self.bytes_written += len(buffer)
+        self.writes += 1
+
+
+class VirtualSharpDisplay:
+    """Same buffer layout and show() traffic as adafruit_sharpmemorydisplay.SharpMemoryDisplay."""
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray((width // 8) * height)
+        self.spi_device = CountingSPIDevice()
+        self._vcom = True
+
+    def fill(self, color):
+        self.buffer[:] = (b'\xff' if color else b'\x00') * len(self.buffer)
+
+    def image(self, img):
+        self.buffer[:] = img.convert("1").tobytes()
+
+    def show(self):
+        line_length = self.width // 8
+        with self.spi_device as spi:
+            spi.write(bytes(1))
+            for line in range(self.height):
+                spi.write(bytes(1))
+                spi.write(self.buffer[line * line_length:(line + 1) * line_length])
+                spi.write(bytes(1))
+            spi.write(bytes(1))
+
+    def to_image(self) -> Image.Image:
+        return Image.frombytes("1", (self.width, self.height), bytes(self.buffer))
+
+
+class VirtualInky:
+    """Inky Impression (UC8159) that just keeps hold of the last image it was given."""
+    WIDTH = 600
+    HEIGHT = 448
+
+    def __init__(self):
+        self.resolution = (self.WIDTH, self.HEIGHT)
+        self.width = self.WIDTH
+        self.height = self.HEIGHT
+        self.image = None
+        self.shows = 0
+
+    def set_image(self, image, saturation=0.5):
+        self.image = image
+
+    def show(self, busy_wait=True):
+        self.shows += 1
+
+
+class VirtualButtons:
+    """The Inky Impression's buttons, pressed by calling press()."""
+    def __init__(self, button1_function: Callable, button2_function: Callable, button3_function: Callable, button4_function: Callable):
+        self.BUTTONS = dict(zip(BUTTON_PINS, (button1_function, button2_function, button3_function, button4_function)))
+
+    def bind_button_events(self):
+        pass
+
+    def press(self, button: int):
+        """Presses button 1 to 4, the function gets the pin like a GPIO callback would."""
+        pin = BUTTON_PINS[button - 1]
+        self.BUTTONS[pin](pin)
+
+
+class VirtualBackend(DisplayBackend):
+    """Everything in memory, for running and profiling the renderers off the Pi.
+
+    What was made last is kept on the backend (sharp_display, inky and
+    buttons) so it can be looked at or pressed. The Pi's fonts have to be
+    installed, or see install_font_fallback().
+    """
+    name = 'virtual'
+
+    def __init__(self):
+        self.sharp_display = None
+        self.inky = None
+        self.buttons = None
+
+    def create_sharp_display(self, width: int, height: int):
+        self.sharp_display = VirtualSharpDisplay(width, height)
+        return self.sharp_display
+
+    def create_inky(self):
+        self.inky = VirtualInky()
+        return self.inky
+
+    def create_buttons(self, button1_function: Callable, button2_function: Callable, button3_function: Callable, button4_function: Callable):
+        self.buttons = VirtualButtons(button1_function, button2_function, button3_function, button4_function)
+        return self.buttons
+
+
+class PngSPIDevice(CountingSPIDevice):
+    def __init__(self, on_transfer: Callable[[], None]):
+        super().__init__()
+        self.on_transfer = on_transfer
+
+    def __exit__(self, *args):
+        self.on_transfer()
+        return False
+
+
+class PngSharpDisplay(VirtualSharpDisplay):
+    """Saves the display to a PNG after every transfer that changed it."""
+    def __init__(self, width: int, height: int, filepath: str):
+        super().__init__(width, height)
+        self.filepath = filepath
+        self.saved: Optional[bytes] = None
+        self.spi_device = PngSPIDevice(self.save)
+
+    def save(self):
+        frame = bytes(self.buffer)
+        if frame != self.saved:
+            self.to_image().save(self.filepath)
+            self.saved = frame
+
+
+class PngInky(VirtualInky):
+    """Saves each image shown to a PNG."""
+    def __init__(self, filepath: str):
+        super().__init__()
+        self.filepath = filepath
+
+    def show(self, busy_wait=True):
+        super().show(busy_wait)
+        if self.image is not None:
+            self.image.convert("RGB").save(self.filepath)
+
+
+class PngBackend(VirtualBackend):
+    """Writes sharp.png and inky.png into directory whenever they'd have changed on the panels."""
+    name = 'png'
+
+    def __init__(self, directory: str="frames"):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def create_sharp_display(self, width: int, height: int):
+        self.sharp_display = PngSharpDisplay(width, height, os.path.join(self.directory, "sharp.png"))
+        return self.sharp_display
+
+    def create_inky(self):
+        self.inky = PngInky(os.path.join(self.directory, "inky.png"))
+        return self.inky
+
+
+def backend_from_env(default: str=HardwareBackend.name) -> DisplayBackend:
+    """The backend named in SHARP_DISPLAY_BACKEND: "hardware", "virtual", "png" or "png:/some/directory".
+
+    Setting SHARP_DISPLAY_FONT_FALLBACK to a font file installs it as the
+    font fallback, for running the clock somewhere without the Pi's fonts.
+    """
+    entry = os.environ.get('SHARP_DISPLAY_BACKEND', default).strip()
+    font_fallback = os.environ.get('SHARP_DISPLAY_FONT_FALLBACK')
+    if font_fallback:
+        install_font_fallback(font_fallback)
+    if entry == HardwareBackend.name:
+        return HardwareBackend()
+    if entry == VirtualBackend.name:
+        return VirtualBackend()
+    if entry == PngBackend.name:
+        return PngBackend()
+    if entry.startswith(f'{PngBackend.name}:'):
+        return PngBackend(entry[len(PngBackend.name) + 1:])
+    raise EnvironmentError(f'Failed because SHARP_DISPLAY_BACKEND has an unknown backend: {entry}')
+
+
+def install_font_fallback(fallback: str=FALLBACK_FONT):
+    """Loads fallback instead of any font that isn't installed on this box.
+
+    The clock fonts live in /usr/share/fonts on the Pi, sizes stay the same
+    so the measurements are still representative. This replaces
+    ImageFont.truetype for the whole process, so it's only ever done when
+    asked for.
+    """
+    truetype = ImageFont.truetype
+    if getattr(truetype, 'fallback', None) == fallback:
+        return
+
+    def truetype_with_fallback(font=None, size=10, *args, **kwargs):
+        if isinstance(font, str) and not os.path.exists(font):
+            font = fallback
+        return truetype(font, size, *args, **kwargs)
+
+    truetype_with_fallback.fallback = fallback
+    ImageFont.truetype = truetype_with_fallback
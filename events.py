@@ -1,19 +1,31 @@
 import datetime
-from typing import List
+from typing import Dict, List
 
 class Event:
-    def __init__(self, start:datetime.datetime, end:datetime.datetime, title:str, description:str):
+    def __init__(self, start:datetime.datetime, end:datetime.datetime, title:str, description:str, uid:str=None):
         self.start = start
         self.end = end
         self.title = title
         self.description = description
+        self.uid = uid
+
+def to_date(dt) -> datetime.date:
+    if isinstance(dt, datetime.datetime):
+        return dt.date()
+    return dt
 
 class Events:
     def __init__(self, start:datetime, end:datetime):
         self.events = []
         self.dates = []
+        # friendly date -> date, and date -> every event on that day, so
+        # looking up a day doesn't mean walking all the events
+        self.days: Dict[str, datetime.date] = {}
+        self.index: Dict[datetime.date, List[Event]] = {}
+        self.first_date = None
+        self.last_date = None
         self.add_dates(start, end)
-    
+
     def add_dates(self, start:datetime, end:datetime):
         #get all unique days between range
         start_date = datetime.date(start.year, start.month, start.day)
@@ -23,10 +35,35 @@ class Events:
             day = start_date + datetime.timedelta(days = i)
             friendly_date = self.get_day_from_dt(day)
             self.dates.append(friendly_date)
+            self.days[friendly_date] = day
+        if self.first_date is None or start_date < self.first_date:
+            self.first_date = start_date
+        if self.last_date is None or end_date > self.last_date:
+            self.last_date = end_date
 
-    def add_event(self, start:datetime, end:datetime, title:str, description:str):
-        event = Event(start=start, end=end, title=title, description=description)
+    def add_event(self, start:datetime, end:datetime, title:str, description:str, uid:str=None):
+        event = Event(start=start, end=end, title=title, description=description, uid=uid)
         self.events.append(event)
+        for day in self.event_days(event):
+            self.index.setdefault(day, []).append(event)
+        return event
+
+    def event_days(self, event:Event) -> List[datetime.date]:
+        """Every day (inside our date range) that the event covers."""
+        first_day = to_date(event.start)
+        last_day = first_day
+        if event.end:
+            last_day = to_date(event.end)
+            # ending bang on midnight, or an all day event's end date, is
+            # exclusive so the event doesn't actually touch that day
+            is_midnight = not isinstance(event.end, datetime.datetime) or event.end.time() == datetime.time.min
+            if last_day > first_day and is_midnight:
+                last_day -= datetime.timedelta(days=1)
+        if self.first_date is not None and first_day < self.first_date:
+            first_day = self.first_date
+        if self.last_date is not None and last_day > self.last_date:
+            last_day = self.last_date
+        return [first_day + datetime.timedelta(days=i) for i in range((last_day - first_day).days + 1)]
 
     def remove_year_from_friendly_date(self, friendly_date:str) -> str:
         return friendly_date[:len(friendly_date) - 5]
@@ -35,16 +72,27 @@ class Events:
         return dt.strftime("%-d %b %Y")
 
     def find_events_by_day(self, friendly_date:str) -> List[Event]:
-        return_events = []
-        for event in self.events:
-            if self.get_day_from_dt(event.start) == friendly_date:
-                return_events.append(event)
+        day = self.days.get(friendly_date)
+        if day is None:
+            day = self.get_date_from_friendly_date(friendly_date)
+        return self.find_events_by_date(day)
 
-        return return_events
-
-    def get_date_from_friendly_date(self, friendly_date: str) -> datetime:
-        return friendly_date.strptime("%-d %b %Y")
-
-    
+    def find_events_by_date(self, day:datetime.date) -> List[Event]:
+        return list(self.index.get(day, []))
 
+    def find_events_in_range(self, start:datetime.date, end:datetime.date) -> List[Event]:
+        """Events on any day from start to end inclusive, each one only once."""
+        return_events = []
+        seen = set()
+        day = to_date(start)
+        end = to_date(end)
+        while day <= end:
+            for event in self.index.get(day, []):
+                if id(event) not in seen:
+                    seen.add(id(event))
+                    return_events.append(event)
+            day += datetime.timedelta(days=1)
+        return return_events
 
+    def get_date_from_friendly_date(self, friendly_date: str) -> datetime.date:
+        return datetime.datetime.strptime(friendly_date, "%d %b %Y").date()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Frame Diff
+# Description          : Works out which lines of a Sharp memory display changed
+#                      : between frames and writes only those lines over SPI
+
+"""FrameDiff module"""
+
+from typing import List, Optional, Tuple
+
+SHARPMEM_BIT_WRITECMD = 0x80
+SHARPMEM_BIT_VCOM = 0x40
+
+
+def reverse_bits(value: int) -> int:
+    result = 0
+    for _ in range(8):
+        result = (result << 1) | (value & 1)
+        value >>= 1
+    return result
+
+
+def line_runs(lines: List[int]) -> List[Tuple[int, int]]:
+    """(first, last + 1) of each run of consecutive line numbers, lines in order."""
+    runs = []
+    for line in lines:
+        if runs and runs[-1][1] == line:
+            runs[-1] = (runs[-1][0], line + 1)
+        else:
+            runs.append((line, line + 1))
+    return runs
+
+
+class FrameDiff:
+    """Keeps the last frame sent to the display so only changed lines get sent again.
+
+    Frames are the packed 1-bit rows PIL gives back from Image.tobytes() for
+    mode "1" images, which is the same MSB-first layout the adafruit
+    SharpMemoryDisplay keeps in its buffer. Pass line_length for frames with
+    other row sizes, like the one byte per pixel Inky frames.
+    """
+    def __init__(self, width: int, height: int, line_length: Optional[int]=None):
+        self.width = width
+        self.height = height
+        self.line_length = line_length or width // 8
+        self.previous_frame: Optional[bytes] = None
+
+    def reset(self):
+        self.previous_frame = None
+
+    def changed_lines(self, frame: bytes) -> List[int]:
+        if self.previous_frame is None or len(self.previous_frame) != len(frame):
+            return list(range(self.height))
+        previous = memoryview(self.previous_frame)
+        current = memoryview(frame)
+        changed = []
+        slice_from = 0
+        for line in range(self.height):
+            slice_to = slice_from + self.line_length
+            if previous[slice_from:slice_to] != current[slice_from:slice_to]:
+                changed.append(line)
+            slice_from = slice_to
+        return changed
+
+    def commit(self, frame: bytes):
+        self.previous_frame = bytes(frame)
+
+
+class SharpLineWriter:
+    """Writes selected lines of a SharpMemoryDisplay buffer over SPI.
+
+    The Sharp memory LCD protocol is line addressed, so after the write
+    command each line is sent as its (bit reversed) address, the line data
+    and a trailing dummy byte. Lines that have not changed are simply left
+    out of the transfer.
+    """
+    def __init__(self, display):
+        self.display = display
+        self.line_length = display.width // 8
+        self.line_addresses = bytes(reverse_bits(line + 1) for line in range(display.height))
+        self._buf = bytearray(1)
+
+    def _command(self, write: bool=True) -> int:
+        # the panel needs VCOM toggled on every transfer, reuse the display's
+        # own state so this stays in step with calls to display.show()
+        command = SHARPMEM_BIT_WRITECMD if write else 0
+        if self.display._vcom:
+            command |= SHARPMEM_BIT_VCOM
+        self.display._vcom = not self.display._vcom
+        return command
+
+    def write_lines(self, lines: List[int]):
+        buffer = memoryview(self.display.buffer)
+        with self.display.spi_device as spi:
+            self._buf[0] = self._command()
+            spi.write(self._buf)
+            for line in lines:
+                slice_from = line * self.line_length
+                self._buf[0] = self.line_addresses[line]
+                spi.write(self._buf)
+                spi.write(buffer[slice_from:slice_from + self.line_length])
+                self._buf[0] = 0
+                spi.write(self._buf)
+            self._buf[0] = 0
+            spi.write(self._buf)
+
+    def write_framebuffer(self, framebuffer, lines: List[int]):
+        """Sends lines straight out of a SharpFramebuffer, one write per run of lines."""
+        with self.display.spi_device as spi:
+            command = self._command()
+            if len(lines) == framebuffer.height:
+                framebuffer.transfer[0] = command
+                spi.write(framebuffer.transfer)
+                return
+            self._buf[0] = command
+            spi.write(self._buf)
+            for first, last in line_runs(lines):
+                spi.write(framebuffer.lines_view(first, last))
+            self._buf[0] = 0
+            spi.write(self._buf)
+
+    def toggle_vcom(self):
+        # nothing changed, but the panel still wants VCOM flipping regularly
+        # to avoid building up a DC bias, so send a display mode command
+        with self.display.spi_device as spi:
+            self._buf[0] = self._command(write=False)
+            spi.write(self._buf)
+            self._buf[0] = 0
+            spi.write(self._buf)
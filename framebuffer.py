@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Framebuffer
+# Description          : Packed 1-bit framebuffer kept in the Sharp memory LCD's
+#                      : SPI transfer layout, drawn into without going through PIL
+
+"""Framebuffer module"""
+
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from frame_diff import reverse_bits
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PackedTile:
+    """A 1-bit tile packed into bytes once for each of the 8 bit positions it can land on.
+
+    mask is the pixels the tile covers and ink which of those are set, so
+    blitting a tile is dst & ~mask | ink a byte at a time whatever x it's at.
+    """
+    def __init__(self, mask: Image.Image, ink: Optional[Image.Image]=None):
+        self.width, self.height = mask.size
+        self.mask = mask.convert("1").tobytes()
+        self.ink = self.mask if ink is None else ink.convert("1").tobytes()
+        self.phases: Dict[int, tuple] = {}
+
+    @classmethod
+    def from_mask(cls, mask: Image.Image, fill: int) -> 'PackedTile':
+        """The tile PIL's image.paste(fill, xy, mask) would draw."""
+        if fill:
+            return cls(mask)
+        return cls(mask, Image.new("1", mask.size, 0))
+
+    def phase(self, shift: int) -> tuple:
+        """(byte width, mask rows, ink rows) with the tile starting shift bits into its first byte."""
+        phase = self.phases.get(shift)
+        if phase is None:
+            phase = self.phases[shift] = self.pack(shift)
+        return phase
+
+    def pack(self, shift: int) -> tuple:
+        packed_width = (self.width + 7) // 8
+        byte_width = (self.width + shift + 7) // 8
+        move = byte_width * 8 - packed_width * 8 - shift
+        packed = []
+        for rows in (self.mask, self.ink):
+            shifted = bytearray()
+            for row in range(self.height):
+                value = int.from_bytes(rows[row * packed_width:(row + 1) * packed_width], 'big')
+                value = value << move if move >= 0 else value >> -move
+                shifted += value.to_bytes(byte_width, 'big')
+            if numpy is not None:
+                packed.append(numpy.frombuffer(bytes(shifted), dtype=numpy.uint8).reshape(self.height, byte_width))
+            else:
+                packed.append(bytes(shifted))
+        return (byte_width, packed[0], packed[1])
+
+
+class SharpFramebuffer:
+    """The whole Sharp memory LCD write transfer in one bytearray.
+
+    The command byte, then for every line its (bit reversed) address, the
+    packed pixels and a trailing zero, then a final zero. Drawing goes
+    straight into the pixel bytes, so any run of lines is already the bytes
+    the panel wants and can be handed to spi.write() without copying. The
+    pixels are MSB first, the same as PIL's mode "1" and the adafruit
+    driver's buffer, as SPI sends the top bit first.
+    """
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.line_length = width // 8
+        self.stride = self.line_length + 2
+        self.transfer = bytearray(1 + self.stride * height + 1)
+        for line in range(height):
+            self.transfer[1 + line * self.stride] = reverse_bits(line + 1)
+        self.blank = {0: bytes(self.transfer), 1: self.pack_bytes(b'\xff' * (self.line_length * height))}
+        self.rows = None
+        if numpy is not None:
+            lines = numpy.frombuffer(self.transfer, dtype=numpy.uint8)[1:-1].reshape(height, self.stride)
+            self.rows = lines[:, 1:1 + self.line_length]
+
+    def line_offset(self, line: int) -> int:
+        return 2 + line * self.stride
+
+    def pack_bytes(self, frame: bytes) -> bytes:
+        """A complete transfer (for load()) from packed rows, like PIL's Image.tobytes()."""
+        transfer = bytearray(self.transfer)
+        line_length = self.line_length
+        for line in range(self.height):
+            offset = self.line_offset(line)
+            transfer[offset:offset + line_length] = frame[line * line_length:(line + 1) * line_length]
+        return bytes(transfer)
+
+    def pack(self, image: Image.Image) -> bytes:
+        return self.pack_bytes(image.convert("1").tobytes())
+
+    def load(self, transfer: bytes):
+        """Replaces the whole frame with one from pack(), a single copy."""
+        self.transfer[:] = transfer
+
+    def fill(self, color: int):
+        self.load(self.blank[1 if color else 0])
+
+    def blit(self, tile: PackedTile, x: int, y: int):
+        x, y = int(x), int(y)
+        first_byte = x // 8
+        byte_width, masks, inks = tile.phase(x % 8)
+        row_from, row_to = max(0, -y), min(tile.height, self.height - y)
+        column_from, column_to = max(0, -first_byte), min(byte_width, self.line_length - first_byte)
+        if row_from >= row_to or column_from >= column_to:
+            return
+        if self.rows is not None:
+            region = self.rows[y + row_from:y + row_to, first_byte + column_from:first_byte + column_to]
+            region &= ~masks[row_from:row_to, column_from:column_to]
+            region |= inks[row_from:row_to, column_from:column_to]
+            return
+        transfer = self.transfer
+        length = column_to - column_from
+        for row in range(row_from, row_to):
+            offset = self.line_offset(y + row) + first_byte + column_from
+            tile_offset = row * byte_width + column_from
+            mask = int.from_bytes(masks[tile_offset:tile_offset + length], 'big')
+            ink = int.from_bytes(inks[tile_offset:tile_offset + length], 'big')
+            value = int.from_bytes(transfer[offset:offset + length], 'big') & ~mask | ink
+            transfer[offset:offset + length] = value.to_bytes(length, 'big')
+
+    def fill_rect(self, x0: int, y0: int, x1: int, y1: int, color: int):
+        """Fills from (x0, y0) to (x1, y1) inclusive, like ImageDraw.rectangle()."""
+        x0, y0 = max(int(x0), 0), max(int(y0), 0)
+        x1, y1 = min(int(x1), self.width - 1), min(int(y1), self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+        first_byte, last_byte = x0 // 8, x1 // 8
+        length = last_byte - first_byte + 1
+        if x0 % 8 == 0 and x1 % 8 == 7:
+            # whole bytes, no need to keep any of what's there
+            fill = (b'\xff' if color else b'\x00') * length
+            for line in range(y0, y1 + 1):
+                offset = self.line_offset(line) + first_byte
+                self.transfer[offset:offset + length] = fill
+            return
+        bits = x1 - x0 + 1
+        mask = ((1 << bits) - 1) << (length * 8 - x0 % 8 - bits)
+        ink = mask if color else 0
+        if self.rows is not None:
+            mask_bytes = numpy.frombuffer(mask.to_bytes(length, 'big'), dtype=numpy.uint8)
+            region = self.rows[y0:y1 + 1, first_byte:last_byte + 1]
+            region &= ~mask_bytes
+            if color:
+                region |= mask_bytes
+            return
+        for line in range(y0, y1 + 1):
+            offset = self.line_offset(line) + first_byte
+            value = int.from_bytes(self.transfer[offset:offset + length], 'big') & ~mask | ink
+            self.transfer[offset:offset + length] = value.to_bytes(length, 'big')
+
+    def changed_lines(self, buffer: bytearray) -> List[int]:
+        """Lines that differ from buffer, packed rows like SharpMemoryDisplay.buffer."""
+        line_length = self.line_length
+        if self.rows is not None:
+            shown = numpy.frombuffer(buffer, dtype=numpy.uint8).reshape(self.height, line_length)
+            return numpy.flatnonzero((self.rows != shown).any(axis=1)).tolist()
+        transfer = memoryview(self.transfer)
+        shown = memoryview(buffer)
+        return [
+            line for line in range(self.height)
+            if transfer[self.line_offset(line):self.line_offset(line) + line_length] != shown[line * line_length:(line + 1) * line_length]
+        ]
+
+    def copy_lines(self, buffer: bytearray, lines: List[int]):
+        line_length = self.line_length
+        for line in lines:
+            offset = self.line_offset(line)
+            buffer[line * line_length:(line + 1) * line_length] = self.transfer[offset:offset + line_length]
+
+    def lines_view(self, first: int, last: int) -> memoryview:
+        """The address, pixels and trailer of lines first to last - 1, ready to send."""
+        return memoryview(self.transfer)[1 + first * self.stride:1 + last * self.stride]
+
+    def to_image(self) -> Image.Image:
+        frame = bytearray(self.line_length * self.height)
+        self.copy_lines(frame, range(self.height))
+        return Image.frombytes("1", (self.width, self.height), bytes(frame))
@@ -82,7 +82,7 @@ class Google_Calendar:
                 description = ""
                 if 'description' in event:
                     description=event['description']
-                events.add_event(start=start_dt, end=end_dt, title=summary, description=description)
+                events.add_event(start=start_dt, end=end_dt, title=summary, description=description, uid=event.get('iCalUID'))
 
         self.events = events
 
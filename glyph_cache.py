@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Glyph Cache
+# Description          : Pre-rendered 1-bit text tiles so the clock doesn't
+#                      : rasterize the same strings through FreeType every tick
+
+"""GlyphCache module"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from PIL import Image, ImageDraw, ImageFont
+
+from framebuffer import PackedTile, SharpFramebuffer
+
+
+@dataclass
+class GlyphTile:
+    mask: Image.Image
+    offset_x: int
+    offset_y: int
+    # where the ink ends relative to the draw.text() origin, which is what
+    # getsize() used to measure
+    right: int
+    bottom: int
+    packed: Optional[PackedTile] = None
+
+
+class GlyphCache:
+    """Caches rendered strings for a single font and colour as 1-bit tiles.
+
+    Tiles are cropped to the ink of the rendered text and remember where that
+    ink sits relative to the draw.text() origin, so pasting a tile at (x, y)
+    gives the same pixels as drawing the text at (x, y). Whole strings are
+    cached rather than single digits so kerning and the measured width match
+    what draw.text() and getsize() would have produced.
+    """
+    MONO_PALETTE = "1"
+
+    def __init__(self, font: ImageFont.FreeTypeFont, fill: int, max_tiles: int=256):
+        self.font = font
+        self.fill = fill
+        self.max_tiles = max_tiles
+        self.tiles: 'OrderedDict[str, GlyphTile]' = OrderedDict()
+
+    def preload(self, strings: Iterable[str]):
+        for text in strings:
+            self.get(text)
+
+    def get(self, text: str) -> GlyphTile:
+        tile = self.tiles.get(text)
+        if tile is not None:
+            self.tiles.move_to_end(text)
+            return tile
+        tile = self.render(text)
+        if len(self.tiles) >= self.max_tiles:
+            # drop the least recently used tile, the strings drawn every tick
+            # stay and the ones that go are things like stale temperatures
+            self.tiles.popitem(last=False)
+        self.tiles[text] = tile
+        return tile
+
+    def render(self, text: str) -> GlyphTile:
+        left, top, right, bottom = self.font.getbbox(text)
+        width = max(right - left, 1)
+        height = max(bottom - top, 1)
+        mask = Image.new(self.MONO_PALETTE, (width, height), 0)
+        draw = ImageDraw.Draw(mask)
+        draw.text((-left, -top), text, font=self.font, fill=255)
+        return GlyphTile(mask, left, top, right, bottom)
+
+    def size(self, text: str):
+        tile = self.get(text)
+        return tile.right, tile.bottom
+
+    def paste(self, image: Image.Image, xy, text: str):
+        tile = self.get(text)
+        x, y = xy
+        image.paste(self.fill, (int(x) + tile.offset_x, int(y) + tile.offset_y), tile.mask)
+
+    def blit(self, framebuffer: SharpFramebuffer, xy, text: str):
+        """Same as paste() but onto a SharpFramebuffer, the tile gets packed the first time."""
+        tile = self.get(text)
+        if tile.packed is None:
+            tile.packed = PackedTile.from_mask(tile.mask, self.fill)
+        x, y = xy
+        framebuffer.blit(tile.packed, int(x) + tile.offset_x, int(y) + tile.offset_y)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : HTTP Client
+# Description          : Shared keep-alive HTTP session for every data source
+
+"""HttpClient module"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 8
+DEFAULT_TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Returns the process wide session, so connections (and TLS) get reused between calls."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def get(url: str, timeout: float=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def fetch_all(fetches: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """Runs independent fetches at the same time, so the total wait is the slowest one.
+
+    Each value in the result is either what the fetch returned or the
+    exception it raised, one bad source doesn't lose the others.
+    """
+    results = {}
+    if not fetches:
+        return results
+    with ThreadPoolExecutor(max_workers=len(fetches), thread_name_prefix='fetch') as executor:
+        futures = {name: executor.submit(fetch) for name, fetch in fetches.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as err:
+                results[name] = err
+    return results
+
+
+def close():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -1,13 +1,10 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
 import os
-from datetime import datetime 
-from typing import List
-
-from inky.inky_uc8159 import Inky
-# To simulate:
-#from inky.mock import InkyMockImpression as Inky
-from inky.auto import auto
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
 
 from font_source_sans_pro import SourceSansProLight
 from font_source_sans_pro import SourceSansPro
@@ -15,12 +12,22 @@ from font_source_sans_pro import SourceSansProSemibold
 from PIL import Image, ImageDraw, ImageFont
 
 from events import Events
-from caldav_calendar import CalDav_Calendar
+from calendar_sources import CalendarSource, CalendarSources, sources_from_env
+from display_backends import backend_from_env
 
 
 class InkyImpression:
-    def __init__(self):
-        self.inky = Inky()
+    # even an unchanged picture gets redrawn now and then, the UC8159 ghosts if left alone
+    FORCE_REFRESH_TIME = 24 * 60 * 60
+    BOX_WIDTH = 86
+    BOX_HEIGHT = 93
+    ROW_GAP = 15
+    RIGHT_EDGE = 598
+
+    def __init__(self, force_refresh_time: int=FORCE_REFRESH_TIME, state_filepath: str="inky_calendar.json", sources: List[CalendarSource]=None, inky=None):
+        if inky is None:
+            inky = backend_from_env().create_inky()
+        self.inky = inky
         self.light_font = ImageFont.truetype(SourceSansProLight, 14)
         self.normal_font = ImageFont.truetype(SourceSansPro, 14)
         self.semibold_font = ImageFont.truetype(SourceSansProSemibold, 14)
@@ -63,6 +70,59 @@ class InkyImpression:
         self.img = Image.open(os.path.join(self.PATH, "resources/backdrop.png")).resize(self.inky.resolution)
         self.draw = ImageDraw.Draw(self.img)
 
+        # the backdrop and day headers never change, day cells are drawn over
+        # a copy of them and only redrawn when their date, events or today-ness
+        # does. Keyed on the cell's top left corner.
+        self.draw_day_headers(self.BOX_WIDTH)
+        self.base = self.img.copy()
+        self.cells: Dict[Tuple[int, int], Tuple[str, str, bool]] = {}
+        self.changed_regions: List[Tuple[int, int, int, int]] = []
+
+        # kept between refreshes so each source only syncs what changed
+        if sources is None:
+            sources = sources_from_env()
+        self.calendar_sources = CalendarSources(sources)
+
+        # what's on the panel right now, so a restart doesn't redraw it for nothing
+        self.force_refresh_time = force_refresh_time
+        self.state_filepath = state_filepath
+        self.shown = self.load_shown()
+
+    def load_shown(self) -> dict:
+        if not os.path.exists(self.state_filepath):
+            return {}
+        try:
+            with open(self.state_filepath) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError) as err:
+            print(f'Inky calendar state unreadable, ignoring it: {err}')
+            return {}
+
+    def save_shown(self):
+        temp_filepath = f'{self.state_filepath}.tmp'
+        with open(temp_filepath, 'w') as state_file:
+            json.dump(self.shown, state_file)
+        os.replace(temp_filepath, self.state_filepath)
+
+    def refresh_due(self) -> bool:
+        shown_at = self.shown.get('shown_at')
+        if shown_at is None:
+            return True
+        return datetime.now() - datetime.fromisoformat(shown_at) >= timedelta(seconds=self.force_refresh_time)
+
+    def events_hash(self, calendar_events: Events) -> str:
+        """Hash of everything render_events draws: the days, today, and each event's times and title."""
+        digest = hashlib.sha256()
+        digest.update(Events.get_day_from_dt(self = None, dt = datetime.now()).encode())
+        for day in calendar_events.dates:
+            digest.update(day.encode())
+            for event in calendar_events.find_events_by_day(day):
+                digest.update(f'|{event.start}|{event.end}|{event.title}'.encode())
+        return digest.hexdigest()
+
+    def frame_hash(self) -> str:
+        return hashlib.sha256(self.img.tobytes()).hexdigest()
+
     def draw_day_headers(self, box_width:int):
         self.draw.rectangle((1, 1, 600, 20),fill=self.BLUE)
         self.draw.text(((box_width*0)+30,2), "MON", self.WHITE, font=self.semibold_font)
@@ -73,16 +133,18 @@ class InkyImpression:
         self.draw.text(((box_width*5)+30,2), "SAT", self.WHITE, font=self.semibold_font)
         self.draw.text(((box_width*6)+30,2), "SUN", self.WHITE, font=self.semibold_font)
 
-    def draw_day(self, x:int, y:int, box_width:int, box_height:int, today_string:str, events:List[str], today=False):
+    def draw_day(self, x:int, y:int, box_width:int, box_height:int, today_string:str, events:List[str], today=False, draw=None, right_limit:int=RIGHT_EDGE):
+        if draw is None:
+            draw = self.draw
         date_box_height = 15
         # draw date background
         colour = self.RED
         if today:
 
             colour = self.GREEN
-        self.draw.rectangle((x, y, x+box_width, y+date_box_height), 
+        draw.rectangle((x, y, x+box_width, y+date_box_height), 
                         fill=colour)
-        self.draw.rectangle((x, y+date_box_height, x+box_width, y+box_height), 
+        draw.rectangle((x, y+date_box_height, x+box_width, y+box_height), 
                         fill=self.WHITE)
 
         # write date
@@ -93,7 +155,7 @@ class InkyImpression:
             center_start_pos = 27
 
         # date header
-        self.draw.text((x + center_start_pos, y-2), today_string , self.WHITE, font=self.semibold_font)
+        draw.text((x + center_start_pos, y-2), today_string , self.WHITE, font=self.semibold_font)
 
         # general y offset
         offset_y = y + (date_box_height -2)
@@ -108,10 +170,10 @@ class InkyImpression:
                     friendly_time = event.start.strftime("%H:%M")
                     if event.end:
                         friendly_time_end = event.end.strftime("%H:%M")
-                        self.draw.text((event_x, event_y), event.title[:13] , self.BLUE, font=self.normal_font)
+                        draw.text((event_x, event_y), event.title[:13] , self.BLUE, font=self.normal_font)
                         if friendly_time != friendly_time_end:
                             friendly_time = str("%s - %s" % (friendly_time, friendly_time_end))
-                            self.draw.text((event_x, event_y+13), friendly_time , self.GREEN, font=self.normal_font)
+                            draw.text((event_x, event_y+13), friendly_time , self.GREEN, font=self.normal_font)
                             event_y = event_y + 15
                     
                     event_y = event_y + 15
@@ -119,46 +181,106 @@ class InkyImpression:
 
         # draw containing box
         right_edge = x+box_width
-        if right_edge > 598:
-            right_edge = 598
+        if right_edge > right_limit:
+            right_edge = right_limit
             
-        self.draw.line((x, offset_y, right_edge, offset_y), colour)
-        self.draw.line((x, offset_y, x, offset_y+box_height), colour)
+        draw.line((x, offset_y, right_edge, offset_y), colour)
+        draw.line((x, offset_y, x, offset_y+box_height), colour)
         
-    def render_caldav_to_inky(self):
-        calendar_data = CalDav_Calendar()
+    def render_calendar_to_inky(self) -> bool:
+        """Fetches every calendar source and redraws the Inky, returns False if there was nothing new to show."""
+        return self.show_events(self.calendar_sources.fetch())
+
+    def show_events(self, calendar_events: Events) -> bool:
+        """Puts calendar_events on the panel unless it's already showing exactly that.
 
+        A full UC8159 refresh takes about 30 seconds of flashing, so the
+        events are hashed before drawing and the finished frame after, and
+        either matching what was last shown skips the panel update.
+        """
+        force = self.refresh_due()
+        events_hash = self.events_hash(calendar_events)
+        if not force and events_hash == self.shown.get('events_hash'):
+            print('Calendar events unchanged, skipping the Inky refresh')
+            return False
+
+        self.render_events(calendar_events)
+        frame_hash = self.frame_hash()
+        if not force and frame_hash == self.shown.get('frame_hash'):
+            print('Calendar image unchanged, skipping the Inky refresh')
+            self.shown['events_hash'] = events_hash
+            self.save_shown()
+            return False
+
+        self.inky.set_image(self.img, saturation=1)
+        self.inky.show()
+        # To simulate:
+        #inky.wait_for_window_close()
+        self.shown = {
+            'events_hash': events_hash,
+            'frame_hash': frame_hash,
+            'shown_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save_shown()
+        return True
+
+    def invalidate_cells(self):
+        self.cells = {}
+        self.img.paste(self.base)
+
+    def day_hash(self, events: List) -> str:
+        digest = hashlib.sha256()
+        for event in events:
+            digest.update(f'|{event.start}|{event.end}|{event.title}'.encode())
+        return digest.hexdigest()
+
+    def render_day_cell(self, x:int, y:int, friendly_day:str, events:List, today:bool) -> Tuple[int, int, int, int]:
+        """Redraws one day's cell on self.img from the base image and returns the box it covers."""
+        width, height = self.img.size
+        region = (x, y, min(x + self.BOX_WIDTH, width), min(y + self.BOX_HEIGHT + self.ROW_GAP, height))
+        cell = self.base.crop(region)
+        self.draw_day(
+            0, 0, self.BOX_WIDTH, self.BOX_HEIGHT, friendly_day, events, today,
+            draw=ImageDraw.Draw(cell),
+            right_limit=self.RIGHT_EDGE - x
+        )
+        self.img.paste(cell, region[:2])
+        return region
+
+    def render_events(self, calendar_events: Events):
+        """Draws the 28 day grid, only touching the cells that changed since last time.
+
+        The boxes that were redrawn are left in self.changed_regions.
+        """
         x = 1
         x_max = 600
         y = 21
         y_max = 488
         day_count = 0
-        box_width = 86
-        box_height = 93
+        box_width = self.BOX_WIDTH
+        box_height = self.BOX_HEIGHT
         today = Events.get_day_from_dt(self = None, dt = datetime.now())
-        self.draw_day_headers(box_width)
-        for day in calendar_data.calendar.events.dates:
-            events = calendar_data.calendar.events.find_events_by_day(day)
+        self.changed_regions = []
+        for day in calendar_events.dates:
+            events = calendar_events.find_events_by_day(day)
 
-            datetime_day = None
-            friendly_day = calendar_data.calendar.events.remove_year_from_friendly_date(day)
+            friendly_day = calendar_events.remove_year_from_friendly_date(day)
             if day_count < 28:
                 todays_the_day = False
                 if today == day:
                     todays_the_day = True
-                self.draw_day(x, y, box_width, box_height, friendly_day, events, todays_the_day)
+                key = (day, self.day_hash(events), todays_the_day)
+                if self.cells.get((x, y)) != key:
+                    self.changed_regions.append(self.render_day_cell(x, y, friendly_day, events, todays_the_day))
+                    self.cells[(x, y)] = key
                 day_count = day_count + 1
             if x < x_max - 150:
                 x = x + box_width
             else:
                 x = 1
-                y = y + box_height + 15
+                y = y + box_height + self.ROW_GAP
 
         # right and bottom edges
         self.draw.line((598,0,598,446), self.RED)
         self.draw.line((0,446,598,446), self.RED)
-
-        self.inky.set_image(self.img, saturation=1)
-        self.inky.show()
-        # To simulate:
-        #inky.wait_for_window_close()
+        return self.img
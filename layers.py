@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Layers
+# Description          : Static/dynamic layer compositing for the Sharp display screens
+
+"""Layers module"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from PIL import Image, ImageDraw
+
+
+@dataclass
+class Layer:
+    """Something drawn onto a screen.
+
+    draw is called with an ImageDraw and version, if given, returns a hashable
+    value that changes whenever the layer would draw something different.
+    """
+    draw: Callable[[ImageDraw.ImageDraw], Optional[ImageDraw.ImageDraw]]
+    version: Optional[Callable[[], Hashable]] = None
+
+    def current_version(self) -> Hashable:
+        if self.version is None:
+            return None
+        return self.version()
+
+
+@dataclass
+class ScreenLayers:
+    static: List[Layer] = field(default_factory=list)
+    dynamic: List[Layer] = field(default_factory=list)
+
+
+class LayerCache:
+    """Keeps a pre-composed bitmap of each screen's static layers.
+
+    The bitmap is only redrawn when the versions of the static layers change,
+    every other tick just gets a copy of it to draw the dynamic layers onto.
+    """
+    def __init__(self, size: Tuple[int, int], mode: str, bg_color: int):
+        self.size = size
+        self.mode = mode
+        self.bg_color = bg_color
+        self.bases: Dict[Hashable, Tuple[tuple, Image.Image]] = {}
+
+    def invalidate(self, key: Hashable=None):
+        if key is None:
+            self.bases = {}
+        else:
+            self.bases.pop(key, None)
+
+    def base(self, key: Hashable, layers: List[Layer]) -> Image.Image:
+        versions = tuple(layer.current_version() for layer in layers)
+        cached = self.bases.get(key)
+        if cached is None or cached[0] != versions:
+            image = Image.new(self.mode, self.size, self.bg_color)
+            draw = ImageDraw.Draw(image)
+            for layer in layers:
+                layer.draw(draw)
+            cached = (versions, image)
+            self.bases[key] = cached
+        return cached[1]
+
+    def compose(self, key: Hashable, layers: List[Layer]) -> Image.Image:
+        return self.base(key, layers).copy()
+
+
+def fit_columns(count: int, width: int, max_column_width: int) -> List[int]:
+    """Left edges for count columns, as wide as max_column_width allows while still fitting in width."""
+    if count < 1:
+        return []
+    column_width = min(max_column_width, width // count)
+    return [column * column_width for column in range(count)]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Photo Pipeline
+# Description          : Camera JPEG to 1-bit display frame conversion
+
+"""PhotoPipeline module"""
+
+from enum import Enum
+from io import BytesIO
+from typing import Tuple, Union
+
+from PIL import Image, ImageChops
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Dither(Enum):
+    Threshold = 0
+    Ordered = 1
+    FloydSteinberg = 2
+
+
+BAYER_4X4 = [
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+]
+
+
+class PhotoConverter:
+    """Turns camera JPEGs into 1-bit frames of a fixed size.
+
+    The JPEG is decoded in draft mode, straight to greyscale and at the
+    smallest DCT scale (1/2, 1/4 or 1/8) that still covers the frame, so
+    most of the full resolution decode never happens. The result is scaled
+    to cover the frame, centre cropped and dithered. Ordered dithering uses
+    NumPy when it's installed and falls back to PIL otherwise.
+    """
+    def __init__(self, size: Tuple[int, int]=(400, 240), dither: Dither=Dither.FloydSteinberg, threshold: int=128):
+        self.size = size
+        self.dither = dither
+        self.threshold = threshold
+        self.resample = Image.BILINEAR
+        self._threshold_table = [0] * threshold + [255] * (256 - threshold)
+        self._ordered_table = [0] + [255] * 255
+
+        width, height = size
+        bayer = [[int((value + 0.5) * 256 / 16) for value in row] for row in BAYER_4X4]
+        self._threshold_map = Image.new("L", size)
+        self._threshold_map.putdata([bayer[y % 4][x % 4] for y in range(height) for x in range(width)])
+        if numpy is not None:
+            self._threshold_array = numpy.asarray(self._threshold_map, dtype=numpy.uint8).copy()
+
+    def convert(self, jpeg: Union[bytes, Image.Image]) -> Image.Image:
+        if isinstance(jpeg, (bytes, bytearray, memoryview)):
+            jpeg = Image.open(BytesIO(jpeg))
+        return self.dither_image(self.decode(jpeg))
+
+    def decode(self, im: Image.Image) -> Image.Image:
+        """Decodes to a greyscale image exactly the frame size, covering it and centre cropped."""
+        target_width, target_height = self.size
+        source_width, source_height = im.size
+        scale = max(target_width / source_width, target_height / source_height)
+        # draft only does anything for a JPEG that hasn't been loaded yet
+        im.draft("L", (int(source_width * scale), int(source_height * scale)))
+        if im.mode != "L":
+            im = im.convert("L")
+
+        source_width, source_height = im.size
+        scale = max(target_width / source_width, target_height / source_height)
+        box_width = target_width / scale
+        box_height = target_height / scale
+        left = (source_width - box_width) / 2
+        top = (source_height - box_height) / 2
+        return im.resize(self.size, self.resample, box=(left, top, left + box_width, top + box_height))
+
+    def dither_image(self, gray: Image.Image) -> Image.Image:
+        if self.dither is Dither.Threshold:
+            return gray.point(self._threshold_table, "1")
+        if self.dither is Dither.Ordered:
+            if numpy is not None:
+                # a new array each time, the stream and snapshot threads share a converter
+                bits = numpy.greater(numpy.asarray(gray), self._threshold_array)
+                return Image.frombytes("1", self.size, numpy.packbits(bits, axis=1).tobytes())
+            return ImageChops.subtract(gray, self._threshold_map).point(self._ordered_table, "1")
+        return gray.convert("1")
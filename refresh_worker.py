@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Refresh Worker
+# Description          : Background data refreshes publishing immutable snapshots
+
+"""RefreshWorker module"""
+
+import dataclasses
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """Everything the render loop shows that comes from a network source."""
+    daily_reports: Tuple = ()
+    hourly_reports: Tuple = ()
+    weather_version: int = 0
+    latest_temperature: Any = ""
+    min_temp_24h: float = 0
+    max_temp_24h: float = 0
+    temps_version: int = 0
+    temps_charts: Tuple = ()
+    calendar_updated: Optional[datetime] = None
+
+
+class RefreshWorker:
+    """Runs data refreshes on a small thread pool so the render loop never waits on them.
+
+    Each refresh returns the snapshot fields it has new values for. Those get
+    published as a brand new DataSnapshot, so readers can just grab
+    worker.snapshot without a lock and keep using it for the whole frame.
+    A source that is still refreshing won't be queued up a second time.
+    """
+    def __init__(self, max_workers: int=3):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='refresh')
+        self.snapshot = DataSnapshot()
+        self._lock = threading.Lock()
+        self._in_flight: Set[str] = set()
+
+    def submit(self, name: str, refresh: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Future]:
+        with self._lock:
+            if name in self._in_flight:
+                print(f'Refresh of {name} still running, skipping')
+                return None
+            self._in_flight.add(name)
+        return self.executor.submit(self._refresh, name, refresh)
+
+    def _refresh(self, name: str, refresh: Callable[[], Optional[Dict[str, Any]]]):
+        try:
+            changes = refresh()
+            if changes:
+                self.publish(**changes)
+        except Exception as err:
+            print(f'Refresh of {name} failed: {err}')
+        finally:
+            with self._lock:
+                self._in_flight.discard(name)
+
+    def publish(self, **changes):
+        with self._lock:
+            self.snapshot = dataclasses.replace(self.snapshot, **changes)
+
+    def shutdown(self, wait: bool=True):
+        self.executor.shutdown(wait=wait)
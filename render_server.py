@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Render Server
+# Description          : Runs one SharpDisplayClock (and its Inky calendar)
+#                      : headless and sends the changed rows of each frame to
+#                      : thin clients driving the actual panels
+
+"""RenderServer module
+
+Every message is a 5 byte header, type and payload length, then the payload.
+Frames go out as a (width, height, row count) header followed by each changed
+row's index and its bytes: packed 1-bit rows for the Sharp display, one
+palette index per pixel for the Inky. Clients send back button presses.
+"""
+
+import argparse
+import select
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from display_backends import SHARP_HEIGHT, SHARP_WIDTH, VirtualBackend, backend_from_env
+from frame_diff import FrameDiff, SharpLineWriter
+
+DEFAULT_PORT = 8765
+
+SHARP_ROWS = 1
+INKY_ROWS = 2
+BUTTON = 3
+
+HEADER = struct.Struct('!BI')
+FRAME_HEADER = struct.Struct('!HHH')
+ROW_INDEX = struct.Struct('!H')
+BUTTON_NUMBER = struct.Struct('!B')
+
+# what inky.inky_uc8159 blends between for its saturation setting, the 8th is "clean"
+SATURATED_PALETTE = [(57, 48, 57), (255, 255, 255), (58, 91, 70), (61, 59, 94), (156, 72, 75), (208, 190, 71), (177, 106, 73), (255, 255, 255)]
+DESATURATED_PALETTE = [(0, 0, 0), (255, 255, 255), (0, 255, 0), (0, 0, 255), (255, 0, 0), (255, 255, 0), (255, 140, 0), (255, 255, 255)]
+
+
+def pack_message(message_type: int, payload: bytes=b'') -> bytes:
+    return HEADER.pack(message_type, len(payload)) + payload
+
+
+def pack_rows(message_type: int, frame: bytes, width: int, height: int, line_length: int, rows: Iterable[int]) -> bytes:
+    rows = list(rows)
+    frame = memoryview(frame)
+    parts = [FRAME_HEADER.pack(width, height, len(rows))]
+    for row in rows:
+        parts.append(ROW_INDEX.pack(row))
+        parts.append(frame[row * line_length:(row + 1) * line_length])
+    return pack_message(message_type, b''.join(parts))
+
+
+def unpack_rows(payload: bytes, line_length: Callable[[int], int]) -> Tuple[int, int, List[Tuple[int, memoryview]]]:
+    """(width, height, [(row, row bytes)]) from a frame message, line_length gives the row size for a width."""
+    width, height, count = FRAME_HEADER.unpack_from(payload)
+    length = line_length(width)
+    payload = memoryview(payload)
+    offset = FRAME_HEADER.size
+    rows = []
+    for _ in range(count):
+        (row,) = ROW_INDEX.unpack_from(payload, offset)
+        offset += ROW_INDEX.size
+        rows.append((row, payload[offset:offset + length]))
+        offset += length
+    return width, height, rows
+
+
+def recv_exactly(connection: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed')
+        data += chunk
+    return bytes(data)
+
+
+def recv_message(connection: socket.socket) -> Tuple[int, bytes]:
+    message_type, length = HEADER.unpack(recv_exactly(connection, HEADER.size))
+    return message_type, recv_exactly(connection, length)
+
+
+def inky_palette(saturation: float) -> List[int]:
+    """The flat 8 colour palette the uc8159 driver quantizes to for a saturation."""
+    palette = []
+    for saturated, desaturated in zip(SATURATED_PALETTE, DESATURATED_PALETTE):
+        palette += [int(s * saturation + d * (1.0 - saturation)) for s, d in zip(saturated, desaturated)]
+    return palette
+
+
+class BroadcastInky:
+    """Looks enough like inky_uc8159.Inky for the calendar, show() sends the frame to the clients."""
+    WIDTH = 600
+    HEIGHT = 448
+
+    def __init__(self, server: 'RenderServer'):
+        self.server = server
+        self.resolution = (self.WIDTH, self.HEIGHT)
+        self.width = self.WIDTH
+        self.height = self.HEIGHT
+        self.frame: Optional[bytes] = None
+
+    def set_image(self, image: Image.Image, saturation: float=0.5):
+        if image.mode != "P":
+            palette_image = Image.new("P", (1, 1))
+            palette_image.putpalette(inky_palette(saturation) + [0, 0, 0] * 248)
+            image = image.convert("RGB").quantize(palette=palette_image)
+        self.frame = image.tobytes()
+
+    def show(self, busy_wait: bool=True):
+        if self.frame is not None:
+            self.server.publish_inky(self.frame)
+
+
+class RenderServerBackend(VirtualBackend):
+    """A virtual Sharp display and buttons for the server's clock, the Inky frames go to the clients."""
+    name = 'render-server'
+
+    def __init__(self, server: 'RenderServer'):
+        super().__init__()
+        self.server = server
+
+    def create_inky(self):
+        self.inky = BroadcastInky(self.server)
+        return self.inky
+
+
+class ClientConnection:
+    """A connected panel and the rows it's still owed.
+
+    Rows pile up here (under the server's lock) until the client's own
+    thread gets round to sending them, so a client that falls behind just
+    gets the latest frame's rows in one go instead of every frame in turn.
+    inky_rows is None when there's no Inky frame to send, an empty set is a
+    frame with nothing changed, which still forces a refresh.
+    """
+    def __init__(self, connection: socket.socket, address):
+        self.connection = connection
+        self.address = address
+        self.sharp_rows: Set[int] = set()
+        self.inky_rows: Optional[Set[int]] = None
+        self.pending = threading.Event()
+
+    def queue(self, sharp_rows: Iterable[int]=(), inky_rows: Optional[Iterable[int]]=None):
+        self.sharp_rows.update(sharp_rows)
+        if inky_rows is not None:
+            if self.inky_rows is None:
+                self.inky_rows = set()
+            self.inky_rows.update(inky_rows)
+        self.pending.set()
+
+    def close(self):
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+
+class RenderServer:
+    """Runs the clock once for every panel in the building.
+
+    The weather, Jarvis and calendar requests are made and the frames drawn
+    here, the clients only get the rows that changed since the last frame.
+    Every client shows the same thing, so a button pressed on any of them
+    changes the screen on all of them.
+    """
+    BROADCAST_PERIOD = 0.1
+    SEND_TIMEOUT = 5
+
+    def __init__(self, host: str='', port: int=DEFAULT_PORT, **clock_options):
+        from SharpDisplayClock import SharpDisplayClock
+        self.inky_diff = FrameDiff(BroadcastInky.WIDTH, BroadcastInky.HEIGHT, line_length=BroadcastInky.WIDTH)
+        self.clients: List[ClientConnection] = []
+        self.lock = threading.Lock()
+        self.listener = socket.create_server((host, port))
+        self.backend = RenderServerBackend(self)
+        self.clock = SharpDisplayClock(backend=self.backend, autostart=False, **clock_options)
+        self.display = self.backend.sharp_display
+        self.inky = self.backend.inky
+        self.sharp_line_length = self.display.width // 8
+        self.sharp_diff = FrameDiff(self.display.width, self.display.height)
+
+    def serve(self, start_screen):
+        threading.Thread(target=self.accept_clients, name='render-accept', daemon=True).start()
+        self.clock.scheduler.add_job('broadcast', self.BROADCAST_PERIOD, self.broadcast)
+        self.clock.select_screen(start_screen)
+        self.clock.scheduler.start()
+
+    def accept_clients(self):
+        while True:
+            connection, address = self.listener.accept()
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.settimeout(self.SEND_TIMEOUT)
+            client = ClientConnection(connection, address)
+            print(f'Render client connected from {address}')
+            with self.lock:
+                # a new panel needs everything, the rest carry on from here
+                if self.sharp_diff.previous_frame is not None:
+                    client.queue(sharp_rows=range(self.display.height))
+                if self.inky_diff.previous_frame is not None:
+                    client.queue(inky_rows=range(self.inky.height))
+                self.clients.append(client)
+            threading.Thread(target=self.send_frames, args=(client,), name='render-client', daemon=True).start()
+            threading.Thread(target=self.read_buttons, args=(client,), name='render-client', daemon=True).start()
+
+    def send_frames(self, client: ClientConnection):
+        """Sends client whatever rows it's owed, from the latest frames.
+
+        Only this client waits on its socket, and the lock is just held to
+        take the rows and frames. A client that doesn't keep up within the
+        socket's timeout is dropped.
+        """
+        while True:
+            client.pending.wait()
+            with self.lock:
+                if client not in self.clients:
+                    return
+                client.pending.clear()
+                sharp_rows, client.sharp_rows = sorted(client.sharp_rows), set()
+                inky_rows, client.inky_rows = client.inky_rows, None
+                # the frames are committed as bytes, so they're safe to use after the lock
+                sharp_frame = self.sharp_diff.previous_frame
+                inky_frame = self.inky_diff.previous_frame
+            try:
+                if sharp_rows:
+                    client.connection.sendall(self.sharp_message(sharp_frame, sharp_rows))
+                if inky_rows is not None:
+                    client.connection.sendall(self.inky_message(inky_frame, sorted(inky_rows)))
+            except OSError as err:
+                print(f'Render client {client.address} failed: {err}')
+                self.drop(client)
+                return
+
+    def read_buttons(self, client: ClientConnection):
+        # wait for presses with select, the socket's timeout is for the sends
+        try:
+            while True:
+                select.select([client.connection], [], [])
+                message_type, payload = recv_message(client.connection)
+                if message_type == BUTTON:
+                    (number,) = BUTTON_NUMBER.unpack(payload)
+                    if 1 <= number <= 4:
+                        self.backend.buttons.press(number)
+        except (OSError, struct.error):
+            pass
+        self.drop(client)
+
+    def drop(self, client: ClientConnection):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+                print(f'Render client {client.address} disconnected')
+        # wake its sender so it sees it's gone
+        client.pending.set()
+        client.close()
+
+    def sharp_message(self, frame: bytes, rows: Iterable[int]) -> bytes:
+        return pack_rows(SHARP_ROWS, frame, self.display.width, self.display.height, self.sharp_line_length, rows)
+
+    def inky_message(self, frame: bytes, rows: Iterable[int]) -> bytes:
+        return pack_rows(INKY_ROWS, frame, self.inky.width, self.inky.height, self.inky.width, rows)
+
+    def broadcast(self):
+        frame = bytes(self.display.buffer)
+        with self.lock:
+            changed_lines = self.sharp_diff.changed_lines(frame)
+            if not changed_lines:
+                return
+            self.sharp_diff.commit(frame)
+            for client in self.clients:
+                client.queue(sharp_rows=changed_lines)
+
+    def publish_inky(self, frame: bytes):
+        with self.lock:
+            changed_lines = self.inky_diff.changed_lines(frame)
+            self.inky_diff.commit(frame)
+            # sent even with no rows, that's how a forced refresh gets to the clients
+            for client in self.clients:
+                client.queue(inky_rows=changed_lines)
+
+
+class RenderClient:
+    """Puts the rows from a RenderServer on the local Sharp display (and Inky, if there is one).
+
+    With nothing coming in the Sharp display still gets its VCOM toggled
+    every second, and the connection is retried with backoff when it drops.
+    """
+    VCOM_PERIOD = 1
+    RECEIVE_TIMEOUT = 30
+    RECONNECT_DELAY = 1
+    RECONNECT_MAX_DELAY = 30
+
+    def __init__(self, host: str, port: int, display, inky=None, buttons: Callable=None):
+        self.host = host
+        self.port = port
+        self.display = display
+        self.line_writer = SharpLineWriter(display)
+        self.inky = inky
+        self.inky_frame: Optional[bytearray] = None
+        # an Inky refresh takes half a minute, don't hold up the Sharp display for it
+        self.inky_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inky')
+        self.connection: Optional[socket.socket] = None
+        self.send_lock = threading.Lock()
+        self.buttons = None
+        if buttons is not None:
+            self.buttons = buttons(
+                button1_function=lambda pin: self.send_button(1),
+                button2_function=lambda pin: self.send_button(2),
+                button3_function=lambda pin: self.send_button(3),
+                button4_function=lambda pin: self.send_button(4))
+            self.buttons.bind_button_events()
+
+    def send_button(self, number: int):
+        with self.send_lock:
+            if self.connection is None:
+                return
+            try:
+                self.connection.sendall(pack_message(BUTTON, BUTTON_NUMBER.pack(number)))
+            except OSError as err:
+                print(f'Sending button {number} failed: {err}')
+
+    def run(self):
+        delay = self.RECONNECT_DELAY
+        while True:
+            try:
+                connection = socket.create_connection((self.host, self.port), timeout=self.RECEIVE_TIMEOUT)
+            except OSError as err:
+                print(f'Render server {self.host}:{self.port} unavailable, retrying in {delay}s: {err}')
+                self.wait(delay)
+                delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+                continue
+            delay = self.RECONNECT_DELAY
+            print(f'Connected to render server {self.host}:{self.port}')
+            with self.send_lock:
+                self.connection = connection
+            try:
+                self.receive(connection)
+            except (OSError, struct.error) as err:
+                print(f'Render server connection lost: {err}')
+            with self.send_lock:
+                self.connection = None
+            connection.close()
+
+    def wait(self, seconds: float):
+        # keep the panel healthy while the server's away
+        until = time.monotonic() + seconds
+        while time.monotonic() < until:
+            self.line_writer.toggle_vcom()
+            time.sleep(min(self.VCOM_PERIOD, max(until - time.monotonic(), 0)))
+
+    def receive(self, connection: socket.socket):
+        while True:
+            ready, _, _ = select.select([connection], [], [], self.VCOM_PERIOD)
+            if not ready:
+                self.line_writer.toggle_vcom()
+                continue
+            self.handle(*recv_message(connection))
+
+    def handle(self, message_type: int, payload: bytes):
+        if message_type == SHARP_ROWS:
+            self.apply_sharp_rows(payload)
+        elif message_type == INKY_ROWS:
+            self.apply_inky_rows(payload)
+
+    def apply_sharp_rows(self, payload: bytes):
+        width, height, rows = unpack_rows(payload, lambda width: width // 8)
+        if (width, height) != (self.display.width, self.display.height):
+            print(f'Ignoring {width}x{height} frame for a {self.display.width}x{self.display.height} display')
+            return
+        line_length = width // 8
+        for row, data in rows:
+            self.display.buffer[row * line_length:(row + 1) * line_length] = data
+        if rows:
+            self.line_writer.write_lines([row for row, _ in rows])
+
+    def apply_inky_rows(self, payload: bytes):
+        if self.inky is None:
+            return
+        width, height, rows = unpack_rows(payload, lambda width: width)
+        if self.inky_frame is None or len(self.inky_frame) != width * height:
+            self.inky_frame = bytearray(width * height)
+        for row, data in rows:
+            self.inky_frame[row * width:(row + 1) * width] = data
+        image = Image.frombytes("P", (width, height), bytes(self.inky_frame))
+        image.putpalette([value for colour in SATURATED_PALETTE for value in colour])
+        self.inky_executor.submit(self.show_inky, image)
+
+    def show_inky(self, image: Image.Image):
+        try:
+            # palette images go to the panel as they are, no quantizing on the Pi
+            self.inky.set_image(image)
+            self.inky.show()
+        except Exception as err:
+            print(f'Inky refresh failed: {err}')
+
+
+def run_client(host: str, port: int, use_inky: bool=True):
+    """Shows the server's frames on SHARP_DISPLAY_BACKEND's displays."""
+    backend = backend_from_env()
+    display = backend.create_sharp_display(SHARP_WIDTH, SHARP_HEIGHT)
+    inky = None
+    buttons = None
+    if use_inky:
+        inky = backend.create_inky()
+        buttons = backend.create_buttons
+    RenderClient(host, port, display, inky=inky, buttons=buttons).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the clock once for many displays")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="fetch the data and render the frames")
+    serve_parser.add_argument("--host", default="")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--screen", default="Weather", help="screen shown at start")
+    client_parser = subparsers.add_parser("client", help="show frames from a render server")
+    client_parser.add_argument("host")
+    client_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    client_parser.add_argument("--no-inky", action="store_true", help="there's only a Sharp display on this Pi")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from SharpDisplayClock import Screens
+        server = RenderServer(args.host, args.port, disable_weather=False, refresh_delay_millis=500, cameras=[], disable_calendar=False)
+        server.serve(Screens[args.screen])
+    else:
+        run_client(args.host, args.port, use_inky=not args.no_inky)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('Quitting RenderServer')
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Scheduler
+# Description          : Single threaded, drift free periodic job scheduler
+
+"""Scheduler module"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class ScheduledJob:
+    """A target run every period seconds, with some stats on how it's going."""
+    def __init__(self, name: str, period: float, target: Callable, deadline: float):
+        self.name = name
+        self.period = period
+        self.target = target
+        self.deadline = deadline
+        self.runs = 0
+        self.missed = 0
+        self.last_duration = 0.0
+
+
+class Scheduler:
+    """Runs periodic jobs from one long lived thread.
+
+    Deadlines are kept against time.monotonic() and advanced by exactly one
+    period each run, so the time spent in a job doesn't creep into the next
+    one. The first deadline of every job lands on a wall clock second
+    boundary, which keeps sub-second periods in step with the clock too.
+    If a job overruns past one or more of its deadlines those ticks are
+    skipped and counted in job.missed rather than being run back to back.
+    """
+    def __init__(self, clock: Callable[[], float]=time.monotonic, wall_clock: Callable[[], float]=time.time):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.thread = None
+        self._should_continue = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def aligned_deadline(self, delay: float=0.0) -> float:
+        wall_time = self.wall_clock() + delay
+        return self.clock() + delay + (math.ceil(wall_time) - wall_time)
+
+    def add_job(self, name: str, period_seconds: float, target: Callable, first_delay: float=0.0) -> ScheduledJob:
+        if period_seconds <= 0:
+            raise ValueError(f'Job {name} needs a period greater than zero, got {period_seconds}')
+        job = ScheduledJob(name, period_seconds, target, self.aligned_deadline(first_delay))
+        with self._lock:
+            self.jobs[name] = job
+        self._wakeup.set()
+        return job
+
+    def remove_job(self, name: str):
+        with self._lock:
+            self.jobs.pop(name, None)
+
+    def run_pending(self) -> Optional[float]:
+        """Runs any jobs that are due, returns the seconds until the next one is."""
+        now = self.clock()
+        with self._lock:
+            due = sorted((job for job in self.jobs.values() if job.deadline <= now), key=lambda job: job.deadline)
+        for job in due:
+            # an earlier job may have removed (or replaced) this one
+            with self._lock:
+                if self.jobs.get(job.name) is not job:
+                    continue
+            self._run_job(job)
+
+        with self._lock:
+            if not self.jobs:
+                return None
+            next_deadline = min(job.deadline for job in self.jobs.values())
+        return max(next_deadline - self.clock(), 0.0)
+
+    def _run_job(self, job: ScheduledJob):
+        started = self.clock()
+        try:
+            job.target()
+        except Exception as err:
+            print(f'Scheduled job {job.name} failed: {err}')
+        finished = self.clock()
+        job.runs += 1
+        job.last_duration = finished - started
+
+        next_deadline = job.deadline + job.period
+        if next_deadline <= finished:
+            skipped = int((finished - next_deadline) // job.period) + 1
+            job.missed += skipped
+            next_deadline += skipped * job.period
+        job.deadline = next_deadline
+
+    def _run(self):
+        while self._should_continue:
+            self._wakeup.clear()
+            wait = self.run_pending()
+            if self._should_continue:
+                self._wakeup.wait(timeout=wait)
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            print("Scheduler already started or running, please wait if you're restarting.")
+            return
+        self._should_continue = True
+        # not a daemon, the scheduler is what keeps the clock process running
+        self.thread = threading.Thread(target=self._run, name='scheduler')
+        self.thread.start()
+
+    def cancel(self):
+        if self.thread is None:
+            print("Scheduler never started or failed to initialize.")
+            return
+        self._should_continue = False
+        self._wakeup.set()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -*- Mode: python; tab-width: 4; indent-tabs-mode: nil; c-basic-offset: 4 -*-
+#
+# Copyright (C)        : 2021 Headstrong Solutions
+# Author:              : Chris Morse <chris@headstrong.solutions>
+#
+# Name                 : Temperature Series
+# Description          : Jarvis temperature readings stored as two packed columns
+
+"""TemperatureSeries module"""
+
+import datetime
+from array import array
+from bisect import bisect_right
+from collections import deque
+from typing import Iterable, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TIMESTAMP_KEY = 'Timestamp'
+VALUE_KEY = 'Value'
+# the sensor rig posts every 5 minutes, used when a reading has no timestamp
+READING_INTERVAL = 5 * 60
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Seconds since the epoch from an ISO 8601 string (Z or offset) or a number, None if neither."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+class TemperatureSeries:
+    """Readings oldest first, timestamps and values each in an array('d').
+
+    A week of 5 minute readings is 32KB this way rather than two thousand
+    dicts, and the window aggregates run over a contiguous slice.
+    """
+    def __init__(self):
+        self.timestamps = array('d')
+        self.values = array('d')
+        # False when the timestamps were made up because readings had none
+        self.timestamped = True
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], now: Optional[float]=None) -> 'TemperatureSeries':
+        """Builds a series from Jarvis records, which come newest first.
+
+        If any reading is missing its timestamp they're all assumed to be
+        READING_INTERVAL apart, the newest one taken at now.
+        """
+        records = list(records)
+        timestamps = [parse_timestamp(record.get(TIMESTAMP_KEY)) for record in reversed(records)]
+        if None in timestamps:
+            if now is None:
+                now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+            count = len(records)
+            timestamps = [now - (count - 1 - i) * READING_INTERVAL for i in range(count)]
+            timestamped = False
+        else:
+            timestamped = True
+        series = cls()
+        series.timestamped = timestamped
+        series.timestamps = array('d', timestamps)
+        series.values = array('d', (float(record[VALUE_KEY]) for record in reversed(records)))
+        return series
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def latest_timestamp(self) -> Optional[float]:
+        return self.timestamps[-1] if self.timestamps else None
+
+    @property
+    def latest_value(self) -> Optional[float]:
+        return self.values[-1] if self.values else None
+
+    def append(self, timestamp: float, value: float):
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+
+    def trim(self, before: float):
+        """Drops readings from before, in batches so it doesn't shuffle the arrays every poll."""
+        stale = bisect_right(self.timestamps, before)
+        if stale and stale >= len(self.values) // 4:
+            del self.timestamps[:stale]
+            del self.values[:stale]
+
+    def window_start(self, seconds: float) -> int:
+        """Index of the first reading less than seconds older than the newest one."""
+        if not self.timestamps:
+            return 0
+        return bisect_right(self.timestamps, self.timestamps[-1] - seconds)
+
+    def min_max(self, seconds: Optional[float]=None) -> Tuple[float, float]:
+        """Lowest and highest value over the last seconds (or everything), (0, 0) if there's nothing."""
+        start = 0 if seconds is None else self.window_start(seconds)
+        if start >= len(self.values):
+            return 0, 0
+        if numpy is not None:
+            window = numpy.frombuffer(self.values, dtype=numpy.float64)[start:]
+            return float(window.min()), float(window.max())
+        window = self.values[start:]
+        return min(window), max(window)
+
+
+class RollingExtremes:
+    """Min and max of the readings from the last window seconds.
+
+    Two monotonic deques: lows only keeps readings lower than everything
+    after them, highs higher, so the answer is always at the front and
+    each reading is added and dropped once however long the window is.
+    """
+    def __init__(self, window: float):
+        self.window = window
+        self.lows = deque()
+        self.highs = deque()
+
+    def push(self, timestamp: float, value: float):
+        while self.lows and self.lows[-1][1] >= value:
+            self.lows.pop()
+        self.lows.append((timestamp, value))
+        while self.highs and self.highs[-1][1] <= value:
+            self.highs.pop()
+        self.highs.append((timestamp, value))
+        self.expire(timestamp)
+
+    def expire(self, now: float):
+        cutoff = now - self.window
+        while self.lows and self.lows[0][0] <= cutoff:
+            self.lows.popleft()
+        while self.highs and self.highs[0][0] <= cutoff:
+            self.highs.popleft()
+
+    @property
+    def min(self) -> float:
+        return self.lows[0][1] if self.lows else 0
+
+    @property
+    def max(self) -> float:
+        return self.highs[0][1] if self.highs else 0
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+from caldav.lib import error
+
+import caldav_calendar
+from caldav_calendar import CalDav_Calendar
+
+
+class StubCalendar:
+    """A calendar with nothing in it, not_found makes the next sync fail like a moved calendar."""
+    def __init__(self, url):
+        self.url = url
+        self.not_found = 0
+
+    def get_property(self, prop):
+        return None
+
+    def objects_by_sync_token(self, sync_token=None, load_objects=False):
+        if self.not_found:
+            self.not_found -= 1
+            raise error.NotFoundError(self.url)
+        return SimpleNamespace(sync_token='token', objects=[])
+
+
+class StubClient:
+    def __init__(self, url, username, password):
+        self.principals = 0
+        self.broken = False
+        self.calendars = {}
+
+    def principal(self):
+        self.principals += 1
+        if self.broken:
+            raise error.DAVError('server down')
+        return SimpleNamespace(url='http://calendar.test/test/', calendars=lambda: [self.calendar('http://calendar.test/test/home/')])
+
+    def calendar(self, url):
+        return self.calendars.setdefault(url, StubCalendar(url))
+
+
+@pytest.fixture
+def sleeps(monkeypatch, tmp_path):
+    monkeypatch.setenv('CALENDARURL', 'http://calendar.test/')
+    monkeypatch.setenv('CALENDARUSERNAME', 'test')
+    monkeypatch.setenv('CALENDARPASSWORD', 'test')
+    monkeypatch.setattr(caldav_calendar.caldav, 'DAVClient', StubClient)
+    delays = []
+    monkeypatch.setattr(caldav_calendar, 'sleep', delays.append)
+    return delays
+
+
+def make_calendar(tmp_path):
+    return CalDav_Calendar(sync_filepath=str(tmp_path / 'sync.json'))
+
+
+def test_discovery_is_reused_until_it_expires(sleeps, tmp_path):
+    calendar = make_calendar(tmp_path)
+    calendar.get_calendar()
+    assert calendar.client.principals == 1
+    assert calendar.calendar.url == 'http://calendar.test/test/home/'
+
+    calendar.sync_state.discovery['discovered_at'] -= CalDav_Calendar.DISCOVERY_TTL + 1
+    calendar.get_calendar()
+    assert calendar.client.principals == 2
+    assert sleeps == []
+
+
+def test_calendar_not_found_discovers_again(sleeps, tmp_path):
+    calendar = make_calendar(tmp_path)
+    calendar.calendar.not_found = 1
+    calendar.get_calendar()
+    assert calendar.client.principals == 2
+    assert sleeps == [CalDav_Calendar.RETRY_DELAY]
+
+
+def test_retries_back_off_and_give_up(sleeps, tmp_path, monkeypatch):
+    monkeypatch.setattr(CalDav_Calendar, 'RETRY_ATTEMPTS', 7)
+    calendar = make_calendar(tmp_path)
+    calendar.client.broken = True
+    calendar.sync_state.forget_discovery()
+    with pytest.raises(error.DAVError):
+        calendar.get_calendar()
+    assert calendar.client.principals == 1 + 7
+    assert sleeps == [1, 2, 4, 8, 16, 16]
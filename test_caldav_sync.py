@@ -0,0 +1,122 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import caldav
+import pytest
+
+from calendar_sync import CalendarSyncState, expand_events, sync_calendar
+
+# Needs a CalDAV server to talk to, a throwaway Radicale is enough:
+#   python -m radicale --storage-filesystem-folder=/tmp/radicale --auth-type=none
+#   CALENDARURL=http://127.0.0.1:5232/ CALENDARUSERNAME=test CALENDARPASSWORD=test pytest test_caldav_sync.py
+needs_server = pytest.mark.skipif(os.environ.get('CALENDARURL') is None, reason='CALENDARURL envar is not set')
+
+START = datetime(2026, 10, 12, 9, 0)
+
+
+def event_ical(uid, title, start, rrule=''):
+    return (
+        'BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//SharpDisplayClock//test//EN\n'
+        f'BEGIN:VEVENT\nUID:{uid}\nDTSTAMP:20261001T000000Z\n'
+        f'DTSTART:{start:%Y%m%dT%H%M%S}\nDTEND:{start + timedelta(hours=1):%Y%m%dT%H%M%S}\n'
+        f'SUMMARY:{title}\n{rrule}END:VEVENT\nEND:VCALENDAR\n'
+    )
+
+
+@pytest.fixture
+def calendar():
+    client = caldav.DAVClient(
+        url=os.environ['CALENDARURL'],
+        username=os.environ.get('CALENDARUSERNAME'),
+        password=os.environ.get('CALENDARPASSWORD')
+    )
+    calendar = client.principal().make_calendar(name=f'sync-test-{os.getpid()}')
+    yield calendar
+    calendar.delete()
+
+
+def titles(state):
+    return sorted(str(occurrence.subcomponents[0]['SUMMARY'])
+                  for occurrence in expand_events(state, START, START + timedelta(days=31)))
+
+
+@needs_server
+def test_sync_only_reports_changes(calendar, tmp_path):
+    state = CalendarSyncState(str(tmp_path / 'sync.json'))
+    calendar.save_event(event_ical('standup', 'Standup', START, 'RRULE:FREQ=WEEKLY;COUNT=3\n'))
+    assert sync_calendar(calendar, state) is True
+    assert titles(state) == ['Standup', 'Standup', 'Standup']
+
+    assert sync_calendar(calendar, state) is False
+
+    calendar.save_event(event_ical('dentist', 'Dentist', START + timedelta(days=2)))
+    assert sync_calendar(calendar, state) is True
+    assert titles(state) == ['Dentist', 'Standup', 'Standup', 'Standup']
+
+    calendar.event_by_uid('standup').delete()
+    assert sync_calendar(calendar, state) is True
+    assert titles(state) == ['Dentist']
+
+
+@needs_server
+def test_sync_state_survives_a_restart(calendar, tmp_path):
+    filepath = str(tmp_path / 'sync.json')
+    calendar.save_event(event_ical('dentist', 'Dentist', START))
+    assert sync_calendar(calendar, CalendarSyncState(filepath)) is True
+
+    restarted = CalendarSyncState(filepath)
+    assert sync_calendar(calendar, restarted) is False
+    assert titles(restarted) == ['Dentist']
+
+
+
+class ListingOnlyCalendar:
+    """A server without sync support, caldav hands back every object and a fake- token.
+
+    Like caldav the fake token is a hash of the listing, and when it's the
+    token we were given no objects come back at all.
+    """
+    url = 'http://calendar.test/home/'
+
+    def __init__(self, events):
+        self.events = events
+
+    def get_property(self, prop):
+        return None
+
+    def objects_by_sync_token(self, sync_token=None, load_objects=False):
+        fake_token = 'fake-' + hashlib.sha256(repr(sorted(self.events.items())).encode()).hexdigest()
+        if sync_token == fake_token:
+            return SimpleNamespace(sync_token=fake_token, objects=[])
+        objects = [
+            SimpleNamespace(url=f'{self.url}{uid}.ics', data=data, props={})
+            for uid, data in self.events.items()
+        ]
+        return SimpleNamespace(sync_token=fake_token, objects=objects)
+
+
+def test_empty_full_listing_clears_the_calendar(tmp_path):
+    state = CalendarSyncState(str(tmp_path / 'sync.json'))
+    calendar = ListingOnlyCalendar({'dentist': event_ical('dentist', 'Dentist', START)})
+    assert sync_calendar(calendar, state) is True
+    assert titles(state) == ['Dentist']
+    assert sync_calendar(calendar, state) is False
+
+    calendar.events = {}
+    assert sync_calendar(calendar, state) is True
+    assert titles(state) == []
+
+
+def test_unchanged_full_listing_keeps_the_calendar(tmp_path):
+    state = CalendarSyncState(str(tmp_path / 'sync.json'))
+    calendar = ListingOnlyCalendar({'dentist': event_ical('dentist', 'Dentist', START)})
+    assert sync_calendar(calendar, state) is True
+    assert sync_calendar(calendar, state) is False
+    assert sync_calendar(calendar, state) is False
+    assert titles(state) == ['Dentist']
+
+    calendar.events['gym'] = event_ical('gym', 'Gym', START)
+    assert sync_calendar(calendar, state) is True
+    assert titles(state) == ['Dentist', 'Gym']
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from caldav_calendar import calendar_window
+from calendar_sources import CalendarSource, IcsFileSource, merge_events
+from events import Events
+
+
+def make_events():
+    return Events(datetime.datetime(2026, 10, 12), datetime.datetime(2026, 11, 12))
+
+
+def test_merge_drops_events_shared_between_calendars():
+    work = make_events()
+    home = make_events()
+    start = datetime.datetime(2026, 10, 13, 9, 0)
+    end = datetime.datetime(2026, 10, 13, 10, 0)
+    work.add_event(start=start, end=end, title='Planning', description=None, uid='planning@example.com')
+    home.add_event(start=start, end=end, title='Planning', description=None, uid='planning@example.com')
+    home.add_event(start=start, end=end, title='Dentist', description=None)
+
+    merged = merge_events(datetime.datetime(2026, 10, 12), datetime.datetime(2026, 11, 12), [work, home])
+    assert sorted(event.title for event in merged.events) == ['Dentist', 'Planning']
+    assert len(merged.find_events_by_date(datetime.date(2026, 10, 13))) == 2
+
+
+def test_merge_keeps_each_occurrence_of_a_recurring_event():
+    events = make_events()
+    for day in (13, 20):
+        start = datetime.datetime(2026, 10, day, 9, 0)
+        events.add_event(start=start, end=start + datetime.timedelta(minutes=15), title='Standup', description=None, uid='standup')
+
+    merged = merge_events(datetime.datetime(2026, 10, 12), datetime.datetime(2026, 11, 12), [events, events])
+    assert len(merged.events) == 2
+
+
+def test_ics_file_source_expands_recurring_events(tmp_path):
+    week_start, _ = calendar_window()
+    start = week_start + datetime.timedelta(hours=9)
+    ics_file = tmp_path / 'holidays.ics'
+    ics_file.write_text(
+        'BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//SharpDisplayClock//test//EN\n'
+        'BEGIN:VEVENT\nUID:gym\nDTSTAMP:20261001T000000Z\n'
+        f'DTSTART:{start:%Y%m%dT%H%M%S}\nDTEND:{start + datetime.timedelta(hours=1):%Y%m%dT%H%M%S}\n'
+        'SUMMARY:Gym\nRRULE:FREQ=WEEKLY;COUNT=2\nEND:VEVENT\nEND:VCALENDAR\n'
+    )
+    source = IcsFileSource(str(ics_file))
+    events = source.fetch()
+    assert [str(event.title) for event in events.events] == ['Gym', 'Gym']
+    assert source.fetch() is events
+
+
+def test_merge_matches_all_day_dates_with_midnight_datetimes():
+    caldav = make_events()
+    google = make_events()
+    caldav.add_event(start=datetime.date(2026, 10, 14), end=datetime.date(2026, 10, 15), title='Holiday', description=None, uid='holiday')
+    google.add_event(start=datetime.datetime(2026, 10, 14), end=datetime.datetime(2026, 10, 15), title='Holiday', description=None, uid='holiday')
+
+    merged = merge_events(datetime.datetime(2026, 10, 12), datetime.datetime(2026, 11, 12), [caldav, google])
+    assert len(merged.events) == 1
+
+
+def test_calendar_source_needs_fetch():
+    class Nothing(CalendarSource):
+        pass
+
+    with pytest.raises(TypeError):
+        Nothing()
@@ -0,0 +1,104 @@
+import http.server
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from CameraServer import JPEG_END, JPEG_START, JarvisCamera, extract_jpeg_frames
+
+
+def jpeg(body: bytes) -> bytes:
+    return JPEG_START + body + JPEG_END
+
+
+def test_frames_split_across_reads_come_out_whole():
+    first, second = jpeg(b"one"), jpeg(b"two")
+    stream = b"--boundary\r\nContent-Type: image/jpeg\r\n\r\n" + first + b"\r\n--boundary\r\n\r\n" + second
+    buffer = bytearray()
+    frames = []
+    # a read boundary lands in every possible place, including mid marker
+    for index in range(0, len(stream), 3):
+        buffer += stream[index:index + 3]
+        frames += extract_jpeg_frames(buffer)
+    assert frames == [first, second]
+    assert buffer == b""
+
+
+def test_partial_frame_is_kept_and_garbage_dropped():
+    buffer = bytearray(b"garbage\xff\x00more" + JPEG_START + b"half")
+    assert extract_jpeg_frames(buffer) == []
+    assert buffer == JPEG_START + b"half"
+
+    buffer += b"rest" + JPEG_END + b"trailing"
+    assert extract_jpeg_frames(buffer) == [jpeg(b"halfrest")]
+    # only a byte that could start the next marker is kept
+    assert len(buffer) <= 1
+
+
+class CameraHandler(http.server.BaseHTTPRequestHandler):
+    """Stands in for the camera's /control endpoint, slow or broken for the settings asked for."""
+    def do_GET(self):
+        name = parse_qs(urlparse(self.path).query)['var'][0]
+        self.server.requests.append(name)
+        time.sleep(self.server.delays.get(name, 0))
+        if name in self.server.broken:
+            # redirects back to itself until requests gives up
+            self.send_response(302)
+            self.send_header('Location', self.path)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def camera():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), CameraHandler)
+    server.requests = []
+    server.delays = {}
+    server.broken = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    camera = JarvisCamera(f"127.0.0.1:{server.server_address[1]}", "", "test")
+    camera.server = server
+    yield camera
+    server.shutdown()
+    server.server_close()
+
+
+def test_settings_the_camera_has_are_skipped(camera):
+    assert camera.applied_settings == camera.CAMERA_DEFAULTS
+    camera.server.requests.clear()
+
+    result = camera.apply_settings({"quality": 10, "vflip": 0})
+    assert result.ok
+    assert result.skipped == {"quality": 10}
+    assert result.applied == {"vflip": 0}
+    assert camera.server.requests == ["vflip"]
+
+
+def test_deadline_ends_the_batch(camera):
+    camera.server.delays["quality"] = 2
+    started = time.monotonic()
+    result = camera.apply_settings({"quality": 12, "vflip": 0}, deadline=0.5)
+    assert time.monotonic() - started < 1.5
+    assert result.applied == {"vflip": 0}
+    assert set(result.failed) == {"quality"}
+
+
+def test_a_failed_setting_clears_what_the_camera_has(camera):
+    camera.server.broken.add("quality")
+    result = camera.apply_settings({"quality": 12, "vflip": 0})
+    assert "Camera request failed" in result.failed["quality"]
+    assert result.applied == {"vflip": 0}
+    assert camera.applied_settings == {}
+    camera.server.requests.clear()
+    # so everything gets sent again next time
+    camera.server.broken.clear()
+    assert camera.set_defaults().ok
+    assert sorted(camera.server.requests) == sorted(camera.CAMERA_DEFAULTS)
@@ -0,0 +1,45 @@
+import math
+from array import array
+
+import chart
+from chart import LineChart, decimate
+from temperature_series import DAY, TemperatureSeries
+
+
+def make_series(count, step=60.0):
+    series = TemperatureSeries()
+    for i in range(count):
+        series.append(i * step, math.sin(i / 50.0) * 10)
+    return series
+
+
+def test_decimate_keeps_first_last_low_high_per_column():
+    timestamps = array('d', [0, 1, 2, 3, 10, 11])
+    values = array('d', [5, 1, 9, 4, 7, 3])
+    columns = decimate(timestamps, values, -1, 11, 2)
+    assert list(columns.first) == [5, 7]
+    assert list(columns.last) == [4, 3]
+    assert list(columns.low) == [1, 3]
+    assert list(columns.high) == [9, 7]
+
+
+def test_decimate_is_the_same_without_numpy(monkeypatch):
+    series = make_series(5000, step=17.0)
+    end = series.latest_timestamp
+    with_numpy = decimate(series.timestamps, series.values, end - DAY, end, 240)
+    monkeypatch.setattr(chart, 'numpy', None)
+    without_numpy = decimate(series.timestamps, series.values, end - DAY, end, 240)
+    for name in ('first', 'last', 'low', 'high'):
+        # NaN marks empty columns and never equals itself
+        assert [None if math.isnan(value) else value for value in getattr(with_numpy, name)] == \
+            [None if math.isnan(value) else value for value in getattr(without_numpy, name)]
+
+
+def test_chart_is_cached_until_the_version_changes():
+    line_chart = LineChart((120, 30), DAY)
+    series = make_series(2000)
+    image = line_chart.render(series, version=1)
+    assert image.size == (120, 30)
+    assert image.getbbox() is not None
+    assert line_chart.render(series, version=1) is image
+    assert line_chart.render(series, version=2) is not image
@@ -0,0 +1,48 @@
+import pytest
+from PIL import Image, ImageFont
+
+import display_backends
+from frame_diff import SharpLineWriter
+
+
+def test_backend_comes_from_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("SHARP_DISPLAY_BACKEND", "virtual")
+    assert isinstance(display_backends.backend_from_env(), display_backends.VirtualBackend)
+    monkeypatch.setenv("SHARP_DISPLAY_BACKEND", f"png:{tmp_path}")
+    backend = display_backends.backend_from_env()
+    assert isinstance(backend, display_backends.PngBackend)
+    assert backend.directory == str(tmp_path)
+    monkeypatch.setenv("SHARP_DISPLAY_BACKEND", "lcd")
+    with pytest.raises(EnvironmentError):
+        display_backends.backend_from_env()
+
+
+def test_png_backend_saves_what_was_sent(tmp_path):
+    backend = display_backends.PngBackend(str(tmp_path))
+    display = backend.create_sharp_display(400, 240)
+    display.buffer[50 * 10:50 * 11] = b"\xff" * 50
+    SharpLineWriter(display).write_lines([10])
+    saved = Image.open(tmp_path / "sharp.png")
+    assert saved.convert("1").tobytes() == bytes(display.buffer)
+
+    pressed = []
+    buttons = backend.create_buttons(*(lambda pin, number=number: pressed.append((number, pin)) for number in range(1, 5)))
+    buttons.press(4)
+    assert pressed == [(4, 24)]
+
+
+def test_backends_leave_the_fonts_alone(monkeypatch, tmp_path):
+    truetype = ImageFont.truetype
+    monkeypatch.setenv("SHARP_DISPLAY_BACKEND", "virtual")
+    display_backends.backend_from_env()
+    display_backends.PngBackend(str(tmp_path))
+    assert ImageFont.truetype is truetype
+
+
+def test_display_backend_needs_every_factory():
+    class SharpOnly(display_backends.DisplayBackend):
+        def create_sharp_display(self, width, height):
+            return display_backends.VirtualSharpDisplay(width, height)
+
+    with pytest.raises(TypeError):
+        SharpOnly()
@@ -0,0 +1,86 @@
+import datetime
+
+from events import Events
+
+
+def make_events():
+    return Events(datetime.datetime(2026, 10, 12), datetime.datetime(2026, 11, 12))
+
+
+def test_finds_events_by_friendly_day():
+    events = make_events()
+    standup = events.add_event(
+        start=datetime.datetime(2026, 10, 13, 9, 0),
+        end=datetime.datetime(2026, 10, 13, 9, 15),
+        title='Standup',
+        description=None
+    )
+    assert events.find_events_by_day('13 Oct 2026') == [standup]
+    assert events.find_events_by_day('14 Oct 2026') == []
+
+
+def test_multi_day_event_is_on_every_day_it_spans():
+    events = make_events()
+    trip = events.add_event(
+        start=datetime.datetime(2026, 10, 20, 18, 0),
+        end=datetime.datetime(2026, 10, 22, 10, 0),
+        title='Trip',
+        description=None
+    )
+    for day in (20, 21, 22):
+        assert events.find_events_by_date(datetime.date(2026, 10, day)) == [trip]
+    assert events.find_events_by_date(datetime.date(2026, 10, 23)) == []
+
+
+def test_midnight_and_all_day_ends_are_exclusive():
+    events = make_events()
+    late = events.add_event(
+        start=datetime.datetime(2026, 10, 14, 23, 0),
+        end=datetime.datetime(2026, 10, 15, 0, 0),
+        title='Late one',
+        description=None
+    )
+    holiday = events.add_event(
+        start=datetime.date(2026, 10, 16),
+        end=datetime.date(2026, 10, 17),
+        title='Holiday',
+        description=None
+    )
+    assert events.find_events_by_date(datetime.date(2026, 10, 14)) == [late]
+    assert events.find_events_by_date(datetime.date(2026, 10, 15)) == []
+    assert events.find_events_by_date(datetime.date(2026, 10, 16)) == [holiday]
+    assert events.find_events_by_date(datetime.date(2026, 10, 17)) == []
+
+
+def test_range_query_returns_each_event_once():
+    events = make_events()
+    trip = events.add_event(
+        start=datetime.date(2026, 10, 20),
+        end=datetime.date(2026, 10, 25),
+        title='Trip',
+        description=None
+    )
+    dentist = events.add_event(
+        start=datetime.datetime(2026, 10, 21, 14, 0),
+        end=datetime.datetime(2026, 10, 21, 15, 0),
+        title='Dentist',
+        description=None
+    )
+    found = events.find_events_in_range(datetime.date(2026, 10, 19), datetime.date(2026, 10, 30))
+    assert found == [trip, dentist]
+
+
+def test_events_outside_the_range_are_not_indexed():
+    events = make_events()
+    events.add_event(
+        start=datetime.date(2026, 1, 1),
+        end=datetime.date(2027, 1, 1),
+        title='All year',
+        description=None
+    )
+    assert len(events.index) == len(events.dates)
+
+
+def test_friendly_date_round_trip():
+    events = make_events()
+    assert events.get_date_from_friendly_date('5 Nov 2026') == datetime.date(2026, 11, 5)
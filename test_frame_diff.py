@@ -0,0 +1,63 @@
+from frame_diff import FrameDiff, SharpLineWriter, line_runs, reverse_bits
+
+
+class RecordingSPIDevice:
+    def __init__(self):
+        self.written = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def write(self, buffer):
+        self.written += bytes(buffer)
+
+
+class RecordingDisplay:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray((width // 8) * height)
+        self.spi_device = RecordingSPIDevice()
+        self._vcom = True
+
+
+def test_changed_lines_only_has_the_lines_that_differ():
+    diff = FrameDiff(16, 4)
+    frame = bytearray(8)
+    assert diff.changed_lines(frame) == [0, 1, 2, 3]
+    diff.commit(frame)
+    assert diff.changed_lines(frame) == []
+    frame[2] = 0x80
+    frame[7] = 0x01
+    assert diff.changed_lines(frame) == [1, 3]
+    diff.reset()
+    assert diff.changed_lines(frame) == [0, 1, 2, 3]
+
+
+def test_reverse_bits_and_line_runs():
+    assert reverse_bits(1) == 0x80
+    assert reverse_bits(240) == 0x0F
+    assert line_runs([1, 2, 3, 7, 9, 10]) == [(1, 4), (7, 8), (9, 11)]
+
+
+def test_write_lines_sends_the_sharp_protocol():
+    display = RecordingDisplay(16, 4)
+    display.buffer[:] = bytes([0x00, 0x00, 0xA5, 0x0F, 0x00, 0x00, 0xFF, 0x01])
+    writer = SharpLineWriter(display)
+    writer.write_lines([1, 3])
+    # write command with VCOM, then the bit reversed address (line + 1), data
+    # and a trailer for each line, then a final zero
+    assert display.spi_device.written == bytes([
+        0x80 | 0x40,
+        0x40, 0xA5, 0x0F, 0x00,
+        0x20, 0xFF, 0x01, 0x00,
+        0x00,
+    ])
+    assert display._vcom is False
+
+    display.spi_device.written.clear()
+    writer.write_lines([0])
+    assert display.spi_device.written == bytes([0x80, 0x80, 0x00, 0x00, 0x00, 0x00])
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+import framebuffer
+from frame_diff import SharpLineWriter
+from framebuffer import PackedTile, SharpFramebuffer
+
+
+class RecordingSPIDevice:
+    def __init__(self):
+        self.written = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def write(self, buffer):
+        self.written += bytes(buffer)
+
+
+class RecordingDisplay:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray((width // 8) * height)
+        self.spi_device = RecordingSPIDevice()
+        self._vcom = True
+
+
+@pytest.fixture(params=["numpy", "python"])
+def packed_path(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(framebuffer, "numpy", None)
+    return request.param
+
+
+def test_drawing_matches_pil(packed_path):
+    generator = random.Random(24)
+    image = Image.new("1", (400, 240), 0)
+    draw = ImageDraw.Draw(image)
+    buffer = SharpFramebuffer(400, 240)
+    for _ in range(60):
+        size = (generator.randint(1, 40), generator.randint(1, 40))
+        mask = Image.frombytes("1", size, generator.randbytes(((size[0] + 7) // 8) * size[1]))
+        fill = generator.choice((0, 255))
+        x, y = generator.randint(-30, 420), generator.randint(-30, 250)
+        image.paste(fill, (x, y), mask)
+        buffer.blit(PackedTile.from_mask(mask, fill), x, y)
+
+        box = sorted((generator.randint(-10, 410), generator.randint(-10, 410)))
+        rows = sorted((generator.randint(-10, 250), generator.randint(-10, 250)))
+        draw.rectangle((box[0], rows[0], box[1], rows[1]), fill=fill)
+        buffer.fill_rect(box[0], rows[0], box[1], rows[1], fill)
+    assert buffer.to_image().tobytes() == image.tobytes()
+
+
+def test_changed_lines_go_out_as_the_adafruit_driver_would(packed_path):
+    buffer = SharpFramebuffer(400, 240)
+    buffer.fill_rect(0, 10, 399, 12, 1)
+    buffer.fill_rect(3, 200, 9, 200, 1)
+    display = RecordingDisplay(400, 240)
+    changed = buffer.changed_lines(display.buffer)
+    assert changed == [10, 11, 12, 200]
+
+    expected = RecordingDisplay(400, 240)
+    buffer.copy_lines(expected.buffer, changed)
+    SharpLineWriter(expected).write_lines(changed)
+    SharpLineWriter(display).write_framebuffer(buffer, changed)
+    assert display.spi_device.written == expected.spi_device.written
+
+    buffer.copy_lines(display.buffer, changed)
+    assert buffer.changed_lines(display.buffer) == []
@@ -0,0 +1,39 @@
+from PIL import Image, ImageDraw, ImageFont
+
+from display_backends import FALLBACK_FONT
+from framebuffer import SharpFramebuffer
+from glyph_cache import GlyphCache
+
+
+def test_pasted_tiles_match_drawn_text():
+    for size, fill, background in ((48, 255, 0), (17, 0, 255)):
+        font = ImageFont.truetype(FALLBACK_FONT, size)
+        cache = GlyphCache(font, fill)
+        for text, xy in (("12:45", (10, 20)), ("-3°C", (3, 101)), ("Wed 14", (217, 5)), ("Q", (-4, -6))):
+            drawn = Image.new("1", (400, 240), background)
+            ImageDraw.Draw(drawn).text(xy, text, font=font, fill=fill)
+            pasted = Image.new("1", (400, 240), background)
+            cache.paste(pasted, xy, text)
+            assert pasted.tobytes() == drawn.tobytes(), (size, text)
+
+            framebuffer = SharpFramebuffer(400, 240)
+            framebuffer.fill(background)
+            cache.blit(framebuffer, xy, text)
+            assert framebuffer.to_image().tobytes() == drawn.tobytes(), (size, text)
+
+
+def test_least_recently_used_tiles_are_evicted():
+    cache = GlyphCache(ImageFont.truetype(FALLBACK_FONT, 12), 255, max_tiles=3)
+    cache.preload(["am", "pm"])
+    cache.get("20°C")
+    cache.get("am")
+    cache.get("21°C")
+    assert list(cache.tiles) == ["20°C", "am", "21°C"]
+    cache.get("pm")
+    assert list(cache.tiles) == ["am", "21°C", "pm"]
+
+
+def test_size_measures_to_the_end_of_the_ink():
+    font = ImageFont.truetype(FALLBACK_FONT, 48)
+    left, top, right, bottom = font.getbbox("12")
+    assert GlyphCache(font, 255).size("12") == (right, bottom)
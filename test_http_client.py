@@ -0,0 +1,67 @@
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+import http_client
+
+
+class SlowHandler(http.server.BaseHTTPRequestHandler):
+    """Answers /slow after half a second, /fail with a 500 and anything else straight away."""
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(0.5)
+        status = 500 if self.path == '/fail' else 200
+        body = self.path.encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    http_client.close()
+
+
+def fetch(url):
+    response = http_client.get(url)
+    response.raise_for_status()
+    return response.text
+
+
+def test_session_is_shared():
+    assert http_client.get_session() is http_client.get_session()
+    http_client.close()
+
+
+def test_fetch_all_keys_results_by_source_and_keeps_failures_apart(server_url):
+    results = http_client.fetch_all({
+        'weather': lambda: fetch(f'{server_url}/weather'),
+        'calendar': lambda: fetch(f'{server_url}/fail'),
+        'temps': lambda: fetch(f'{server_url}/temps'),
+    })
+    assert results['weather'] == '/weather'
+    assert results['temps'] == '/temps'
+    assert isinstance(results['calendar'], requests.HTTPError)
+
+
+def test_fetch_all_runs_the_fetches_at_the_same_time(server_url):
+    started = time.monotonic()
+    results = http_client.fetch_all({
+        'one': lambda: fetch(f'{server_url}/slow'),
+        'two': lambda: fetch(f'{server_url}/slow'),
+    })
+    elapsed = time.monotonic() - started
+    assert results == {'one': '/slow', 'two': '/slow'}
+    assert elapsed < 0.9
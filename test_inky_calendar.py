@@ -0,0 +1,75 @@
+import datetime
+
+import pytest
+
+import inky_caldav_calendar
+from display_backends import VirtualInky
+from events import Events
+from inky_caldav_calendar import InkyImpression
+
+
+class Clock(datetime.datetime):
+    current = datetime.datetime(2026, 10, 14, 10, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(inky_caldav_calendar, "datetime", Clock)
+    monkeypatch.setattr(Clock, "current", Clock.current)
+    return Clock
+
+
+def make_calendar(tmp_path, **kwargs):
+    return InkyImpression(state_filepath=str(tmp_path / "inky_calendar.json"), sources=[], inky=VirtualInky(), **kwargs)
+
+
+def make_events():
+    events = Events(datetime.datetime(2026, 10, 12), datetime.datetime(2026, 11, 8))
+    start = datetime.datetime(2026, 10, 15, 9, 0)
+    events.add_event(start=start, end=start + datetime.timedelta(hours=1), title="Dentist", description=None)
+    return events
+
+
+def cell_region(calendar, day):
+    x, y = next(xy for xy, key in calendar.cells.items() if key[0] == day)
+    return (x, y, x + calendar.BOX_WIDTH, y + calendar.BOX_HEIGHT + calendar.ROW_GAP)
+
+
+def test_unchanged_events_skip_the_panel_until_a_refresh_is_due(tmp_path, clock):
+    calendar = make_calendar(tmp_path, force_refresh_time=60 * 60)
+    assert calendar.show_events(make_events())
+    assert not calendar.show_events(make_events())
+    assert calendar.inky.shows == 1
+
+    # a restart remembers what's on the panel
+    restarted = make_calendar(tmp_path, force_refresh_time=60 * 60)
+    assert not restarted.show_events(make_events())
+    assert restarted.inky.shows == 0
+
+    clock.current += datetime.timedelta(hours=1)
+    assert calendar.show_events(make_events())
+    assert calendar.inky.shows == 2
+
+
+def test_only_the_changed_cells_are_redrawn(tmp_path, clock):
+    calendar = make_calendar(tmp_path)
+    events = make_events()
+    calendar.render_events(events)
+    assert len(calendar.changed_regions) == 28
+
+    calendar.render_events(events)
+    assert calendar.changed_regions == []
+
+    # midnight moves today's highlight from one cell to the next
+    clock.current = datetime.datetime(2026, 10, 15, 0, 1)
+    calendar.render_events(events)
+    assert sorted(calendar.changed_regions) == sorted([cell_region(calendar, "14 Oct 2026"), cell_region(calendar, "15 Oct 2026")])
+
+    start = datetime.datetime(2026, 10, 20, 18, 0)
+    events.add_event(start=start, end=start + datetime.timedelta(hours=2), title="Climbing", description=None)
+    calendar.render_events(events)
+    assert calendar.changed_regions == [cell_region(calendar, "20 Oct 2026")]
@@ -1,5 +1,15 @@
+import http.server
+import json
+import os
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
 from Jarvis import Jarvis
 
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
 def test_recieves_temps():
     jarvis = Jarvis()
     temps = jarvis.get_temps()
@@ -7,4 +17,72 @@ def test_recieves_temps():
     assert jarvis.min_temp_24h != 0
     assert jarvis.max_temp_24h != 0
     assert jarvis.min_temp_week != 0
-    assert jarvis.max_temp_week != 0
\ No newline at end of file
+    assert jarvis.max_temp_week != 0
+
+
+class JarvisHandler(http.server.BaseHTTPRequestHandler):
+    """Stands in for the Jarvis temps endpoint, honouring since like the real one."""
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.server.queries.append(query)
+        records = self.server.records
+        if 'since' in query:
+            records = [record for record in records if record['Timestamp'] > query['since'][0]]
+        body = json.dumps(records).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def jarvis_server(monkeypatch):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), JarvisHandler)
+    with open(os.path.join(FIXTURES, "jarvis_temps.json")) as fixture:
+        server.records = json.load(fixture)
+    server.queries = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('JARVIS_TEMPS_URL', f'http://127.0.0.1:{server.server_address[1]}/temps')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def poll(jarvis):
+    jarvis.next_access = jarvis.next_access.min
+    return jarvis.get_temps()
+
+
+def test_polls_only_for_new_readings(jarvis_server):
+    records = jarvis_server.records
+    jarvis = Jarvis()
+    assert poll(jarvis) == records[0]['Value']
+    assert len(jarvis.temperatures) == len(records)
+    day_values = [float(record['Value']) for record in records[:288]]
+    assert (jarvis.min_temp_24h, jarvis.max_temp_24h) == (min(day_values), max(day_values))
+
+    records.insert(0, {'Timestamp': '2026-10-18T12:05:00Z', 'Value': '-3.50'})
+    assert poll(jarvis) == '-3.50'
+    assert jarvis_server.queries[-1] == {'since': ['2026-10-18T12:00:00Z']}
+    assert jarvis.min_temp_24h == -3.5
+    assert jarvis.temperatures.latest_value == -3.5
+
+    version = jarvis.version
+    poll(jarvis)
+    assert jarvis.version == version
+
+
+def test_filters_readings_when_since_is_ignored(jarvis_server, monkeypatch):
+    monkeypatch.setenv('JARVIS_SINCE_PARAM', '')
+    records = jarvis_server.records
+    jarvis = Jarvis()
+    poll(jarvis)
+    records.insert(0, {'Timestamp': '2026-10-18T12:05:00Z', 'Value': '30.00'})
+    poll(jarvis)
+    assert jarvis_server.queries[-1] == {}
+    assert len(jarvis.temperatures) == len(records)
+    assert jarvis.max_temp_week == 30.0
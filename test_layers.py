@@ -0,0 +1,34 @@
+from layers import Layer, LayerCache, fit_columns
+
+
+def test_static_layer_is_only_redrawn_when_its_version_changes():
+    cache = LayerCache((40, 20), "1", 0)
+    drawn = []
+    version = {"value": 1}
+
+    def draw_box(draw):
+        drawn.append(version["value"])
+        draw.rectangle((0, 0, 9, 9), fill=255 if version["value"] == 1 else 0)
+
+    layers = [Layer(draw_box, lambda: version["value"])]
+    first = cache.base("weather", layers)
+    assert cache.base("weather", layers) is first
+    frame = cache.compose("weather", layers)
+    assert frame is not first and frame.tobytes() == first.tobytes()
+    assert drawn == [1]
+
+    version["value"] = 2
+    second = cache.base("weather", layers)
+    assert second is not first
+    assert drawn == [1, 2]
+    assert second.getpixel((0, 0)) == 0 and first.getpixel((0, 0)) == 255
+
+    cache.invalidate("weather")
+    cache.base("weather", layers)
+    assert drawn == [1, 2, 2]
+
+
+def test_fit_columns():
+    assert fit_columns(3, 400, 100) == [0, 100, 200]
+    assert fit_columns(5, 400, 100) == [0, 80, 160, 240, 320]
+    assert fit_columns(0, 400, 100) == []
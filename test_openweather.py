@@ -0,0 +1,132 @@
+import functools
+import http.server
+import json
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+import OpenWeather
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class CountingHandler(http.server.SimpleHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        CountingHandler.requests_seen.append(self.path)
+        self.path = "/weather_report.json"
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def weather_server():
+    CountingHandler.requests_seen = []
+    handler = functools.partial(CountingHandler, directory=FIXTURES)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/onecall"
+    server.shutdown()
+    server.server_close()
+
+
+def make_weather(monkeypatch, tmp_path, url):
+    monkeypatch.setenv("OPENWEATHER", "test")
+    monkeypatch.setenv("MYLOCATIONLAT", "51.5072")
+    monkeypatch.setenv("MYLOCATIONLONG", "-0.1276")
+    weather = OpenWeather.OpenWeather()
+    assert "exclude=current,minutely,alerts" in weather.base_url
+    weather.base_url = url
+    weather.filepath = str(tmp_path / "weather_report.json")
+    return weather
+
+
+def test_cache_survives_a_restart(monkeypatch, tmp_path, weather_server):
+    weather = make_weather(monkeypatch, tmp_path, weather_server)
+    daily = weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
+    assert len(daily) == 8
+    assert weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False) is daily
+
+    restarted = make_weather(monkeypatch, tmp_path, weather_server)
+    assert len(restarted.get_report(OpenWeather.WeatherReport.Daily, from_file=False)) == 8
+    assert len(CountingHandler.requests_seen) == 1
+
+
+def test_stale_data_is_used_when_the_api_is_down(monkeypatch, tmp_path):
+    cache_file = tmp_path / "weather_report.json"
+    # the old cache format, just the payload
+    shutil.copy(os.path.join(FIXTURES, "weather_report.json"), cache_file)
+    os.utime(cache_file, (0, 0))
+
+    weather = make_weather(monkeypatch, tmp_path, "http://127.0.0.1:9/onecall")
+    assert len(weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)) == 8
+    with open(cache_file) as saved:
+        assert json.load(saved)["calls"]["count"] == 1
+
+
+def test_call_budget_is_shared(monkeypatch, tmp_path, weather_server):
+    weather = make_weather(monkeypatch, tmp_path, weather_server)
+    weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
+
+    other = make_weather(monkeypatch, tmp_path, weather_server)
+    other.cache_ttl = 0
+    other.call_budget = 1
+    assert len(other.get_report(OpenWeather.WeatherReport.Daily, from_file=False)) == 8
+    assert len(CountingHandler.requests_seen) == 1
+
+
+def test_failed_calls_count_and_an_empty_budget_raises(monkeypatch, tmp_path):
+    weather = make_weather(monkeypatch, tmp_path, "http://127.0.0.1:9/onecall")
+    weather.call_budget = 1
+    with pytest.raises(OpenWeather.requests.RequestException):
+        weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
+    with open(tmp_path / "weather_report.json") as saved:
+        assert json.load(saved)["calls"]["count"] == 1
+
+    restarted = make_weather(monkeypatch, tmp_path, "http://127.0.0.1:9/onecall")
+    restarted.call_budget = 1
+    with pytest.raises(OpenWeather.WeatherDataUnavailable):
+        restarted.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
+
+
+def test_hourly_times_are_local(monkeypatch, tmp_path):
+    monkeypatch.setenv("TZ", "Europe/London")
+    time.tzset()
+    try:
+        weather = make_weather(monkeypatch, tmp_path, "http://127.0.0.1:9/onecall")
+        weather.filepath = os.path.join(FIXTURES, "weather_report.json")
+        hourly = weather.get_report(OpenWeather.WeatherReport.Hourly)
+        # 1792324800 is 12:00 UTC on 18 October 2026, 1pm in London during BST
+        first = next(report for report in hourly if report.dt == 1792324800)
+        assert first.friendly_time == "1pm"
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_reports_are_built_once_per_fetch(monkeypatch, tmp_path, weather_server):
+    weather = make_weather(monkeypatch, tmp_path, weather_server)
+    built = []
+    create_hourly_reports = weather.create_hourly_reports
+    monkeypatch.setattr(weather, "create_hourly_reports", lambda: built.append("hourly") or create_hourly_reports())
+
+    daily = weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False)
+    assert weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False) is daily
+    assert built == []
+
+    hourly = weather.get_report(OpenWeather.WeatherReport.Hourly, from_file=False)
+    assert weather.get_report(OpenWeather.WeatherReport.Hourly, from_file=False) is hourly
+    assert built == ["hourly"]
+
+    # a new fetch means new reports
+    weather.cache_ttl = 0
+    assert weather.get_report(OpenWeather.WeatherReport.Daily, from_file=False) is not daily
+    assert weather.get_report(OpenWeather.WeatherReport.Hourly, from_file=False) is not hourly
+    assert built == ["hourly", "hourly"]
+    assert len(CountingHandler.requests_seen) == 3
@@ -0,0 +1,68 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+import photo_pipeline
+from photo_pipeline import Dither, PhotoConverter
+
+
+@pytest.fixture(params=["numpy", "pil"])
+def dither_path(request, monkeypatch):
+    if request.param == "pil":
+        monkeypatch.setattr(photo_pipeline, "numpy", None)
+    return request.param
+
+
+def jpeg(image):
+    output = BytesIO()
+    image.save(output, "JPEG", quality=95)
+    return output.getvalue()
+
+
+def test_threshold_splits_a_gradient_in_half():
+    converter = PhotoConverter((256, 4), Dither.Threshold)
+    gradient = Image.new("L", (256, 4))
+    gradient.putdata([x for _ in range(4) for x in range(256)])
+    frame = converter.dither_image(gradient)
+    assert frame.mode == "1"
+    assert [frame.getpixel((x, 0)) for x in (0, 127, 128, 255)] == [0, 0, 255, 255]
+
+
+def test_ordered_dither_sets_half_of_mid_grey(dither_path):
+    converter = PhotoConverter((8, 8), Dither.Ordered)
+    frame = converter.dither_image(Image.new("L", (8, 8), 128))
+    assert list(frame.getdata()).count(255) == 32
+    # the 4x4 pattern repeats
+    assert frame.crop((0, 0, 4, 4)).tobytes() == frame.crop((4, 4, 8, 8)).tobytes()
+    assert list(converter.dither_image(Image.new("L", (8, 8), 0)).getdata()).count(255) == 0
+    assert list(converter.dither_image(Image.new("L", (8, 8), 255)).getdata()).count(0) == 0
+
+
+def test_floyd_steinberg_keeps_the_average_brightness():
+    converter = PhotoConverter((40, 24), Dither.FloydSteinberg)
+    frame = converter.dither_image(Image.new("L", (40, 24), 64))
+    assert 40 * 24 // 4 - 20 < list(frame.getdata()).count(255) < 40 * 24 // 4 + 20
+
+
+@pytest.mark.parametrize("size, bands", [
+    # taller than the frame, the top and bottom are cropped off
+    ((800, 600), lambda draw: (draw.rectangle((0, 0, 799, 49), fill=0), draw.rectangle((0, 550, 799, 599), fill=0))),
+    # wider than the frame, the sides are cropped off
+    ((1200, 400), lambda draw: (draw.rectangle((0, 0, 99, 399), fill=0), draw.rectangle((1100, 0, 1199, 399), fill=0))),
+])
+def test_photos_cover_the_frame_and_are_centre_cropped(size, bands):
+    photo = Image.new("L", size, 255)
+    bands(ImageDraw.Draw(photo))
+    frame = PhotoConverter((400, 240), Dither.Threshold).convert(jpeg(photo))
+    assert frame.size == (400, 240)
+    assert frame.mode == "1"
+    assert list(frame.getdata()).count(0) == 0
+
+
+def test_small_photos_are_scaled_up():
+    photo = Image.new("L", (200, 120), 0)
+    ImageDraw.Draw(photo).rectangle((100, 0, 199, 119), fill=255)
+    frame = PhotoConverter((400, 240), Dither.Threshold).convert(photo)
+    assert frame.size == (400, 240)
+    assert frame.getpixel((150, 120)) == 0 and frame.getpixel((250, 120)) == 255
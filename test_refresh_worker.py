@@ -0,0 +1,41 @@
+import threading
+
+from refresh_worker import DataSnapshot, RefreshWorker
+
+
+def test_refresh_publishes_a_new_snapshot():
+    worker = RefreshWorker()
+    before = worker.snapshot
+    worker.submit("temps", lambda: {"latest_temperature": 21.5, "temps_version": 1}).result()
+    worker.shutdown()
+    assert worker.snapshot is not before
+    assert worker.snapshot.latest_temperature == 21.5
+    assert worker.snapshot.temps_version == 1
+    # the old snapshot is left as it was for whoever is still drawing with it
+    assert before == DataSnapshot()
+
+
+def test_running_refresh_is_not_queued_again(capsys):
+    worker = RefreshWorker()
+    release = threading.Event()
+    first = worker.submit("weather", lambda: release.wait(5) and {"weather_version": 1})
+    assert worker.submit("weather", lambda: {"weather_version": 2}) is None
+    assert "Refresh of weather still running, skipping" in capsys.readouterr().out
+    release.set()
+    first.result()
+    assert worker.submit("weather", lambda: {"weather_version": 3}).result() is None
+    worker.shutdown()
+    assert worker.snapshot.weather_version == 3
+
+
+def test_failed_refresh_is_logged_and_can_run_again(capsys):
+    worker = RefreshWorker()
+
+    def broken():
+        raise ValueError("no data")
+
+    worker.submit("calendar", broken).result()
+    assert "Refresh of calendar failed: no data" in capsys.readouterr().out
+    assert worker.snapshot == DataSnapshot()
+    assert worker.submit("calendar", lambda: {"weather_version": 1}) is not None
+    worker.shutdown()
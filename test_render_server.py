@@ -0,0 +1,90 @@
+import socket
+import threading
+import time
+
+from PIL import Image
+
+import render_server
+from frame_diff import FrameDiff
+from display_backends import VirtualInky, VirtualSharpDisplay
+
+
+def test_changed_sharp_rows_reach_the_client():
+    display = VirtualSharpDisplay(400, 240)
+    client = render_server.RenderClient("127.0.0.1", 0, display)
+    diff = FrameDiff(400, 240)
+    diff.commit(bytes(display.buffer))
+
+    frame = bytearray(display.buffer)
+    frame[50 * 50:51 * 50] = b"\xaa" * 50
+    frame[239 * 50] = 0x01
+    rows = diff.changed_lines(bytes(frame))
+    assert rows == [50, 239]
+
+    message = render_server.pack_rows(render_server.SHARP_ROWS, frame, 400, 240, 50, rows)
+    message_type, length = render_server.HEADER.unpack_from(message)
+    client.handle(message_type, message[render_server.HEADER.size:])
+    assert bytes(display.buffer) == bytes(frame)
+    # command, address/data/trailer for each row and the final dummy byte
+    assert display.spi_device.bytes_written == 1 + 2 * 52 + 1
+
+
+def test_inky_frames_arrive_as_palette_indices():
+    inky = VirtualInky()
+    client = render_server.RenderClient("127.0.0.1", 0, VirtualSharpDisplay(400, 240), inky=inky)
+    broadcast = render_server.BroadcastInky(server=None)
+    broadcast.set_image(Image.new("RGB", broadcast.resolution, (255, 0, 0)), saturation=1)
+    assert set(broadcast.frame) == {4}
+
+    message = render_server.pack_rows(render_server.INKY_ROWS, broadcast.frame, 600, 448, 600, range(448))
+    client.handle(render_server.INKY_ROWS, message[render_server.HEADER.size:])
+    client.inky_executor.shutdown(wait=True)
+    assert inky.shows == 1
+    assert inky.image.mode == "P"
+    assert inky.image.tobytes() == broadcast.frame
+
+
+def make_server(clients):
+    """A RenderServer's broadcasting half, without the clock behind it."""
+    server = render_server.RenderServer.__new__(render_server.RenderServer)
+    server.lock = threading.Lock()
+    server.clients = []
+    server.display = VirtualSharpDisplay(400, 240)
+    server.sharp_line_length = 50
+    server.sharp_diff = FrameDiff(400, 240)
+    server.inky = VirtualInky()
+    server.inky_diff = FrameDiff(600, 448, line_length=600)
+    for connection in clients:
+        connection.settimeout(0.5)
+        client = render_server.ClientConnection(connection, connection.getsockname())
+        server.clients.append(client)
+        threading.Thread(target=server.send_frames, args=(client,), daemon=True).start()
+    return server
+
+
+def test_a_stalled_client_holds_up_nobody():
+    stalled, stalled_end = socket.socketpair()
+    healthy, healthy_end = socket.socketpair()
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    server = make_server([stalled, healthy])
+    display = VirtualSharpDisplay(400, 240)
+    client = render_server.RenderClient("127.0.0.1", 0, display)
+
+    started = time.monotonic()
+    for frame in range(20):
+        server.display.buffer[:] = bytes([frame]) * len(server.display.buffer)
+        server.broadcast()
+    # nothing's sent on the caller's thread
+    assert time.monotonic() - started < 0.2
+
+    healthy_end.settimeout(2)
+    while bytes(display.buffer) != bytes(server.display.buffer):
+        client.handle(*render_server.recv_message(healthy_end))
+
+    # the stalled one times out on its own thread and is dropped
+    deadline = time.monotonic() + 3
+    while len(server.clients) > 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [client.connection for client in server.clients] == [healthy]
+    for connection in (stalled_end, healthy, healthy_end):
+        connection.close()
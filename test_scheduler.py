@@ -0,0 +1,91 @@
+from scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_first_deadline_lands_on_wall_clock_second():
+    clock = FakeClock(100.0)
+    scheduler = Scheduler(clock=clock, wall_clock=lambda: 1000.25)
+    job = scheduler.add_job('clock', 0.5, lambda: None)
+    assert job.deadline == 100.75
+
+
+def test_deadlines_do_not_drift_with_job_duration():
+    clock = FakeClock(100.0)
+    scheduler = Scheduler(clock=clock, wall_clock=lambda: 1000.0)
+
+    def slow_job():
+        clock.now += 0.2
+
+    job = scheduler.add_job('clock', 1, slow_job)
+    for tick in range(5):
+        clock.now = 100.0 + tick
+        scheduler.run_pending()
+    assert job.runs == 5
+    assert job.missed == 0
+    assert job.deadline == 105.0
+
+
+def test_overrunning_job_skips_and_counts_missed_ticks():
+    clock = FakeClock(100.0)
+    scheduler = Scheduler(clock=clock, wall_clock=lambda: 1000.0)
+
+    def stuck_job():
+        clock.now += 3.5
+
+    job = scheduler.add_job('clock', 1, stuck_job)
+    scheduler.run_pending()
+    assert job.runs == 1
+    assert job.missed == 3
+    assert job.deadline == 104.0
+
+
+def test_jobs_with_different_periods():
+    clock = FakeClock(100.0)
+    scheduler = Scheduler(clock=clock, wall_clock=lambda: 1000.0)
+    ran = []
+    scheduler.add_job('clock', 1, lambda: ran.append('clock'))
+    scheduler.add_job('weather', 3, lambda: ran.append('weather'), first_delay=1)
+    for tick in range(5):
+        clock.now = 100.0 + tick
+        wait = scheduler.run_pending()
+        assert 0 <= wait <= 1
+    assert ran.count('clock') == 5
+    assert ran.count('weather') == 2
+
+
+def test_failing_job_keeps_being_scheduled():
+    clock = FakeClock(100.0)
+    scheduler = Scheduler(clock=clock, wall_clock=lambda: 1000.0)
+
+    def broken_job():
+        raise ValueError('broken')
+
+    job = scheduler.add_job('broken', 1, broken_job)
+    scheduler.run_pending()
+    clock.now = 101.0
+    scheduler.run_pending()
+    assert job.runs == 2
+
+
+def test_job_removed_by_an_earlier_job_does_not_run():
+    clock = FakeClock(100.0)
+    scheduler = Scheduler(clock=clock, wall_clock=lambda: 1000.0)
+    ran = []
+
+    def select_screen():
+        ran.append('screen')
+        scheduler.remove_job('alerts')
+
+    scheduler.add_job('screen', 1, select_screen)
+    scheduler.add_job('alerts', 1, lambda: ran.append('alerts'), first_delay=0.5)
+    clock.now = 102.0
+    scheduler.run_pending()
+    assert ran == ['screen']
+    assert 'alerts' not in scheduler.jobs
@@ -0,0 +1,25 @@
+from temperature_series import DAY, TemperatureSeries, parse_timestamp
+
+
+def test_day_window_uses_timestamps_not_record_count():
+    # newest first, like Jarvis sends them, with a gap of a day and a half
+    records = [
+        {'Timestamp': '2026-10-18T12:00:00Z', 'Value': '15.5'},
+        {'Timestamp': '2026-10-18T06:00:00Z', 'Value': '9.25'},
+        {'Timestamp': '2026-10-17T00:00:00Z', 'Value': '2.0'},
+        {'Timestamp': '2026-10-16T12:00:00Z', 'Value': '21.0'},
+    ]
+    series = TemperatureSeries.from_records(records)
+    assert series.latest_value == 15.5
+    assert series.latest_timestamp == parse_timestamp('2026-10-18T12:00:00Z')
+    assert series.min_max(DAY) == (9.25, 15.5)
+    assert series.min_max() == (2.0, 21.0)
+
+
+def test_missing_timestamps_are_spaced_five_minutes_apart():
+    records = [{'Value': str(value)} for value in range(300)]
+    series = TemperatureSeries.from_records(records, now=1_000_000.0)
+    assert series.timestamps[-1] == 1_000_000.0
+    assert series.timestamps[-1] - series.timestamps[-2] == 300
+    # 288 readings five minutes apart is the last 24 hours
+    assert series.min_max(DAY) == (0, 287)